@@ -0,0 +1,154 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np  # array code throughout; the game itself never imports this module
+
+import maze_pack
+from maze_gen import NUM_LEVELS
+from maze_core import MazeLevel, level_time_limit
+
+# ---------- Config ----------
+STEP_SECONDS = 0.1  # game time one batched step stands for; timeouts use GameCore's limits
+
+# ---------- Batch environment ----------
+class BatchEnv:
+    # n agents spread over a list of MazeLevels, stepped together. Every level's wall
+    # bytes are packed into one flat array and agents live in it as flat cell indices,
+    # so a step is a handful of gathers: walls[cell] >> action & 1 is the wall test.
+    # Actions are maze_grid directions (0=up 1=right 2=down 3=left).
+    def __init__(self, levels, n, difficulty='Normal', step_seconds=STEP_SECONDS, auto_reset=True):
+        m = len(levels)
+        cols = np.array([lvl.cols for lvl in levels], dtype=np.int64)
+        sizes = np.array([lvl.cols * lvl.rows for lvl in levels], dtype=np.int64)
+        offset = np.zeros(m, dtype=np.int64)
+        offset[1:] = np.cumsum(sizes)[:-1]
+        self.walls = np.concatenate([np.frombuffer(lvl.walls.cells, dtype=np.uint8) for lvl in levels])
+        start = offset + np.array([r*lvl.cols + c for lvl in levels for r, c in (lvl.start,)], dtype=np.int64)
+        goal = offset + np.array([r*lvl.cols + c for lvl in levels for r, c in (lvl.goal,)], dtype=np.int64)
+        # GameCore.update: time is up once the whole seconds elapsed exceed the limit
+        limits = np.array([level_time_limit(lvl, difficulty) for lvl in levels], dtype=np.float64)
+        step_limit = np.ceil((limits + 1) / step_seconds).astype(np.int64)
+
+        self.levels = levels
+        self.n = n
+        self.auto_reset = auto_reset
+        self.offset = offset
+        self.cols = cols
+        self.level_of = np.arange(n) % m
+        # per-agent copies of the per-level tables: one gather less per step
+        lv = self.level_of
+        self._start = start[lv]
+        self._goal = goal[lv]
+        self._limit = step_limit[lv]
+        # cell index step per (agent, action), flattened; row a*4 + d
+        ones = np.ones(m, dtype=np.int64)
+        self._delta = np.stack([-cols, ones, cols, -ones], axis=1)[lv].ravel()
+        self._base = np.arange(n, dtype=np.int64) * 4
+
+        self.cell = self._start.copy()
+        self.steps = np.zeros(n, dtype=np.int64)
+        self.done = np.zeros(n, dtype=bool)  # only used without auto_reset
+        self.reached = 0
+        self.timeouts = 0
+
+    def reset(self, mask=None):
+        if mask is None:
+            mask = np.ones(self.n, dtype=bool)
+        self.cell[mask] = self._start[mask]
+        self.steps[mask] = 0
+        self.done[mask] = False
+
+    def step(self, actions):
+        # -> (moved, reached, timed_out) boolean arrays for this step
+        a = np.asarray(actions, dtype=np.int64)
+        cell = self.cell
+        moved = ((self.walls[cell] >> a) & 1) == 0
+        if not self.auto_reset:
+            moved &= ~self.done
+            self.steps += ~self.done
+        else:
+            self.steps += 1
+        cell += np.where(moved, self._delta[self._base + a], 0)
+        reached = cell == self._goal
+        timed_out = (self.steps >= self._limit) & ~reached
+        if not self.auto_reset:
+            reached &= ~self.done
+            timed_out &= ~self.done
+        finished = reached | timed_out
+        self.reached += int(np.count_nonzero(reached))
+        self.timeouts += int(np.count_nonzero(timed_out))
+        if self.auto_reset:
+            if finished.any():
+                self.cell[finished] = self._start[finished]
+                self.steps[finished] = 0
+        else:
+            self.done |= finished
+        return moved, reached, timed_out
+
+    def observe(self):
+        # wall mask under every agent (bit d set = wall on side d)
+        return self.walls[self.cell]
+
+    def positions(self):
+        # (n, 2) array of (row, col) inside each agent's own level
+        lv = self.level_of
+        local = self.cell - self.offset[lv]
+        cols = self.cols[lv]
+        return np.stack([local // cols, local % cols], axis=1)
+
+# ---------- Rollouts (one process or many) ----------
+def load_levels(indices, difficulty='Normal'):
+    # straight from the level pack when there is a current one, else generated
+    pack = maze_pack.open_pack()
+    if pack is None:
+        return [MazeLevel(idx, difficulty) for idx in indices]
+    return [MazeLevel(idx, difficulty, pack.grid(idx, difficulty), metrics=pack.metrics(idx, difficulty))
+            for idx in indices]
+
+def random_policy(env, rng):
+    return rng.integers(0, 4, env.n)
+
+def rollout(indices, n, steps, difficulty='Normal', seed=0, policy=random_policy):
+    # policy(env, rng) -> n actions; must be a module-level function to run in a pool
+    env = BatchEnv(load_levels(indices, difficulty), n, difficulty)
+    rng = np.random.default_rng(seed)
+    for _ in range(steps):
+        env.step(policy(env, rng))
+    return {'agent_steps': n * steps, 'reached': env.reached, 'timeouts': env.timeouts}
+
+def run_parallel(indices, n, steps, difficulty='Normal', workers=None, seed=0, policy=random_policy):
+    # agents are independent, so they are split evenly over processes; each worker
+    # maps the level pack itself and only the counters come back
+    workers = workers or os.cpu_count() or 1
+    shares = [n // workers + (i < n % workers) for i in range(workers)]
+    shares = [s for s in shares if s]
+    if len(shares) == 1:
+        return rollout(indices, n, steps, difficulty, seed, policy)
+    totals = {}
+    with ProcessPoolExecutor(max_workers=len(shares)) as ex:
+        futures = [ex.submit(rollout, indices, share, steps, difficulty, seed + i, policy)
+                   for i, share in enumerate(shares)]
+        for fut in futures:
+            for key, value in fut.result().items():
+                totals[key] = totals.get(key, 0) + value
+    return totals
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Random-walk agents on the built-in levels, batched in NumPy")
+    parser.add_argument('--agents', type=int, default=10_000)
+    parser.add_argument('--steps', type=int, default=1_000)
+    parser.add_argument('--difficulty', default='Normal')
+    parser.add_argument('--workers', type=int, default=1, help="processes (default: %(default)s; 0 = all cores)")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    t = time.perf_counter()
+    stats = run_parallel(range(NUM_LEVELS), args.agents, args.steps, args.difficulty,
+                         workers=args.workers or None, seed=args.seed)
+    dt = time.perf_counter() - t
+    print(f"{stats['agent_steps']} agent-steps in {dt:.2f} s ({stats['agent_steps'] / dt / 1e6:.1f}M/s), "
+          f"{stats['reached']} reached the goal, {stats['timeouts']} timed out")
+
+if __name__ == '__main__':
+    main()
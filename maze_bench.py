@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+
+# headless: no window, no audio device needed
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+os.environ.setdefault('SDL_AUDIODRIVER', 'dummy')
+os.environ.setdefault('PYGAME_HIDE_SUPPORT_PROMPT', '1')  # keep stdout clean JSON
+
+import pygame
+
+import maze_game
+from maze_core import GameCore
+from maze_gen import NUM_LEVELS, DIFFICULTIES, generate, generate_maze_cols_rows, level_algorithm, level_seed
+from maze_solver import a_star
+
+DEFAULT_TOLERANCE = 0.15  # compare mode: flag anything this much slower than baseline
+STARTUP_TARGET_MS = 200   # import maze_game -> menu on screen, median
+
+# ---------- Timing helpers ----------
+def _summary(samples):
+    samples = sorted(samples)
+    n = len(samples)
+    return {
+        'median_ms': samples[n // 2] * 1e3,
+        'min_ms': samples[0] * 1e3,
+        'p95_ms': samples[min(n - 1, int(n * 0.95))] * 1e3,
+        'runs': n,
+    }
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t)
+    return _summary(samples)
+
+# ---------- Benchmarks ----------
+def bench_generation(repeat):
+    # each difficulty's configured generator for every distinct size class it uses
+    out = {}
+    for difficulty in DIFFICULTIES:
+        algorithm = level_algorithm(difficulty)
+        for cols, rows in sorted({generate_maze_cols_rows(i, difficulty) for i in range(NUM_LEVELS)}):
+            out[f"generate.{algorithm}.{cols}x{rows}"] = measure(
+                lambda: generate(algorithm, cols, rows, random.Random(level_seed(0))), repeat)
+    return out
+
+def bench_hints(queries):
+    # a_star from random cells to the goal vs the per-level distance field walk
+    rng = random.Random(1)
+    out = {}
+    for difficulty in DIFFICULTIES:
+        astar, field = [], []
+        for idx in range(0, NUM_LEVELS, 7):
+            lvl = maze_game.MazeLevel(idx, difficulty).prepare()
+            for _ in range(queries):
+                st = (rng.randrange(lvl.rows), rng.randrange(lvl.cols))
+                t = time.perf_counter()
+                a_star(st, lvl.goal, lvl.walls, lvl.cols, lvl.rows)
+                astar.append(time.perf_counter() - t)
+                t = time.perf_counter()
+                lvl.compute_hint(st)
+                field.append(time.perf_counter() - t)
+        out[f"hint.a_star.{difficulty}"] = _summary(astar)
+        out[f"hint.field.{difficulty}"] = _summary(field)
+    return out
+
+def bench_core_moves(repeat, moves=100_000):
+    # GameCore.move without pygame in the loop: random walks on a large level, goal disabled
+    rng = random.Random(2)
+    dirs = [rng.randrange(4) for _ in range(moves)]
+    core = GameCore(maze_game.LevelProvider('Normal'), 'Normal', clock=lambda: 0)
+    lvl = core.load_level(NUM_LEVELS - 1)
+    lvl.goal = (-1, -1)
+    move = core.move
+    def walk():
+        for d in dirs:
+            move(d)
+    out = {f"core.move.x{moves}": measure(walk, repeat)}
+    core.levels.close()
+    return out
+
+def bench_batch(repeat, agents=10_000, steps=100):
+    # BatchEnv.step over all levels, random actions drawn up front; needs numpy
+    try:
+        import numpy as np
+        import maze_batch
+    except ImportError:
+        return {}
+    env = maze_batch.BatchEnv(maze_batch.load_levels(range(NUM_LEVELS)), agents)
+    rng = np.random.default_rng(3)
+    actions = [rng.integers(0, 4, agents) for _ in range(steps)]
+    def run():
+        for a in actions:
+            env.step(a)
+    return {f"batch.step.{agents}x{steps}": measure(run, repeat)}
+
+def bench_startup(repeat):
+    # fresh interpreter each run: import + MazeGame() + first menu frame on screen.
+    # startup.game_first_frame leaves out `import pygame` itself (numpy, pkg_resources),
+    # which the game cannot make faster; STARTUP_TARGET_MS applies to that part.
+    code = ("import time; t0 = time.perf_counter(); import pygame; t1 = time.perf_counter(); "
+            "import maze_game; g = maze_game.MazeGame(); g.draw_menu(); pygame.display.flip(); "
+            "t2 = time.perf_counter(); print(t2 - t0, t2 - t1); g.levels.close()")
+    here = os.path.dirname(os.path.abspath(__file__))
+    total, game = [], []
+    for _ in range(repeat):
+        res = subprocess.run([sys.executable, '-c', code], cwd=here, env=dict(os.environ),
+                             capture_output=True, text=True, check=True)
+        t, g = res.stdout.strip().splitlines()[-1].split()
+        total.append(float(t))
+        game.append(float(g))
+    return {'startup.first_frame': _summary(total), 'startup.game_first_frame': _summary(game)}
+
+def bench_frames(game, frames):
+    # per-frame draw cost for every level and difficulty, measured the way run() draws
+    out = {}
+    for difficulty in DIFFICULTIES:
+        game.difficulty = difficulty
+        game.levels.difficulty = difficulty
+        samples = {'playing': [], 'pause': [], 'timeup': [], 'level_complete': []}
+        for idx in range(NUM_LEVELS):
+            game.load_level(idx)
+            game.state = 'playing'
+            game.draw_playing()
+            for _ in range(frames):
+                t = time.perf_counter()
+                game.draw_playing()
+                pygame.display.update(game.update_rects)
+                samples['playing'].append(time.perf_counter() - t)
+            for state, draw in (('pause', game.draw_pause), ('timeup', game.draw_timeup),
+                                ('level_complete', game.draw_level_complete)):
+                game.state = state
+                game.modal_state = None  # first frame composes the frozen backdrop
+                for _ in range(frames):
+                    t = time.perf_counter()
+                    draw()
+                    pygame.display.flip()
+                    samples[state].append(time.perf_counter() - t)
+        for state, s in samples.items():
+            out[f"frame.{state}.{difficulty}"] = _summary(s)
+    game.state = 'level_select'
+    out['frame.level_select'] = measure(lambda: (game.draw_level_select(), pygame.display.flip()), frames * 10)
+    game.state = 'menu'
+    return out
+
+# ---------- Baseline comparison ----------
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    # (name, baseline ms, current ms, ratio) for every benchmark slower than tolerance allows
+    regressions = []
+    for name, cur in results['results'].items():
+        old = baseline.get('results', {}).get(name)
+        if not old or old['median_ms'] <= 0:
+            continue
+        ratio = cur['median_ms'] / old['median_ms']
+        if ratio > 1 + tolerance:
+            regressions.append((name, old['median_ms'], cur['median_ms'], ratio))
+    return regressions
+
+def run_all(quick=False):
+    repeat = 3 if quick else 15
+    results = {}
+    results.update(bench_generation(repeat))
+    results.update(bench_hints(5 if quick else 40))
+    results.update(bench_core_moves(repeat))
+    results.update(bench_batch(repeat))
+    results.update(bench_startup(2 if quick else 5))
+    game = maze_game.MazeGame()
+    try:
+        results.update(bench_frames(game, 3 if quick else 20))
+    finally:
+        game.levels.close()
+    return {
+        'meta': {
+            'python': platform.python_version(),
+            'pygame': pygame.version.ver,
+            'platform': platform.platform(),
+            'quick': quick,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless benchmarks for Maze Runner")
+    parser.add_argument('--out', help="write results JSON here (default: stdout)")
+    parser.add_argument('--baseline', help="compare against a previous results JSON; exit 1 on regressions")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed slowdown vs baseline, as a fraction (default: %(default)s)")
+    parser.add_argument('--quick', action='store_true', help="fewer repetitions, for a smoke run")
+    parser.add_argument('--startup-target', type=float, default=STARTUP_TARGET_MS, metavar='MS',
+                        help="exit 1 if startup.game_first_frame median exceeds this (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = run_all(quick=args.quick)
+    text = json.dumps(results, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+    status = 0
+    startup = results['results']['startup.game_first_frame']['median_ms']
+    if startup > args.startup_target:
+        print(f"STARTUP {startup:.1f} ms to first menu frame, target {args.startup_target:.0f} ms", file=sys.stderr)
+        status = 1
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        for name, old, cur, ratio in regressions:
+            print(f"REGRESSION {name}: {old:.3f} ms -> {cur:.3f} ms ({ratio:.2f}x)", file=sys.stderr)
+        if regressions:
+            return 1
+        print(f"no regressions beyond {args.tolerance:.0%} vs {args.baseline}", file=sys.stderr)
+    return status
+
+if __name__ == '__main__':
+    sys.exit(main())
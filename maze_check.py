@@ -0,0 +1,272 @@
+import argparse
+import os
+import random
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np  # the invariant checks are whole-grid array ops
+
+import maze_gen
+from maze_grid import MazeGrid, DR, DC
+from maze_gen import (NUM_LEVELS, DIFFICULTIES, GENERATORS, generate, generate_maze_cols_rows, level_algorithm,
+                      level_seed)
+from maze_solver import DistanceField, TreeField, TreeIndex, a_star, level_metrics, DEGREE
+
+# ---------- Config ----------
+DEFAULT_SEEDS = 100    # per generator and size
+DEFAULT_STARTS = 8     # a_star / TreeIndex queries per maze; 0 = every cell
+SEEDS_PER_TASK = 25
+MAX_FAILURES = 20      # printed; the count covers all of them
+
+# step (dr+1, dc+1) -> maze_grid direction, -1 for anything that is not one orthogonal step
+STEP_DIR = np.array([[-1, 0, -1], [3, -1, 1], [-1, 2, -1]])
+
+def check_sizes():
+    # every size the levels use, plus generate_maze_cols_rows' clamp bounds
+    sizes = {generate_maze_cols_rows(i, d) for d in DIFFICULTIES for i in range(NUM_LEVELS)}
+    return sorted(sizes | {(8, 6), (60, 48)})
+
+# ---------- Reference implementations ----------
+# slow and obviously right; the fast versions must agree with them exactly
+def reference_dfs(cols, rows, rng):
+    # textbook backtracker on walls[r][c][d] lists; draws from rng like recursive_backtracker
+    # (one choice over the unvisited sides, in direction order)
+    walls = [[[1, 1, 1, 1] for _ in range(cols)] for _ in range(rows)]
+    visited = [[False] * cols for _ in range(rows)]
+    visited[0][0] = True
+    stack = [(0, 0)]
+    while stack:
+        r, c = stack[-1]
+        options = [d for d in range(4) if 0 <= r + DR[d] < rows and 0 <= c + DC[d] < cols
+                   and not visited[r + DR[d]][c + DC[d]]]
+        if not options:
+            stack.pop()
+            continue
+        d = rng.choice(options)
+        nr, nc = r + DR[d], c + DC[d]
+        walls[r][c][d] = 0
+        walls[nr][nc][(d + 2) % 4] = 0
+        visited[nr][nc] = True
+        stack.append((nr, nc))
+    return MazeGrid(cols, rows, bytearray(sum(w[d] << d for d in range(4)) for row in walls for w in row))
+
+def without_numpy(fn):
+    # a generator's plain-Python branch, for the ones with a NumPy fast path
+    def run(cols, rows, rng):
+        saved = maze_gen.np
+        maze_gen.np = None
+        try:
+            return fn(cols, rows, rng)
+        finally:
+            maze_gen.np = saved
+    return run
+
+REFERENCES = {
+    'dfs': (reference_dfs, 'reference_dfs'),
+    'binary_tree': (without_numpy(GENERATORS['binary_tree']), 'plain-Python binary_tree'),
+    'sidewinder': (without_numpy(GENERATORS['sidewinder']), 'plain-Python sidewinder'),
+}
+
+def reference_distances(grid, target):
+    # plain BFS; (rows, cols) array, -1 where target cannot be reached
+    dist = {target: 0}
+    queue = deque([target])
+    while queue:
+        cur = queue.popleft()
+        for nb in grid.neighbors(*cur):
+            if nb not in dist:
+                dist[nb] = dist[cur] + 1
+                queue.append(nb)
+    out = np.full((grid.rows, grid.cols), -1, dtype=np.int64)
+    for (r, c), d in dist.items():
+        out[r, c] = d
+    return out
+
+# ---------- Invariants ----------
+def check_walls(a):
+    # a: (rows, cols) wall masks. Sides agree between neighbours, the border is closed and
+    # there are exactly cells-1 passages (with every cell reachable: a perfect maze)
+    bad = []
+    if (a > 0b1111).any():
+        bad.append(('mask', f"{np.count_nonzero(a > 0b1111)} cells use bits above the 4 sides"))
+    if not ((a[0] & 1).all() and (a[-1] & 4).all() and (a[:, 0] & 8).all() and (a[:, -1] & 2).all()):
+        bad.append(('border', "an outer wall is open"))
+    lr = np.count_nonzero((a[:, :-1] >> 1 & 1) != (a[:, 1:] >> 3 & 1))
+    ud = np.count_nonzero((a[:-1] >> 2 & 1) != (a[1:] & 1))
+    if lr or ud:
+        bad.append(('mirror', f"{lr} right/left and {ud} down/up walls set on one side only"))
+    passages = np.count_nonzero(~a[:, :-1] & 2) + np.count_nonzero(~a[:-1] & 4)
+    if passages != a.size - 1:
+        bad.append(('tree', f"{passages} passages for {a.size} cells"))
+    return bad
+
+def check_path(a, path, start, goal, length):
+    # None if path is a walk start -> goal of exactly length steps through open sides
+    if not path:
+        return "no path"
+    p = np.asarray(path, dtype=np.int64)
+    if tuple(p[0]) != start or tuple(p[-1]) != goal:
+        return f"runs {tuple(p[0])} -> {tuple(p[-1])}"
+    step = np.diff(p, axis=0)
+    if (np.abs(step).sum(axis=1) != 1).any():
+        return "jumps between non-adjacent cells"
+    dirs = STEP_DIR[step[:, 0] + 1, step[:, 1] + 1]
+    if (a[p[:-1, 0], p[:-1, 1]] >> dirs & 1).any():
+        return "walks through a wall"
+    if len(p) - 1 != length:
+        return f"{len(p) - 1} steps, shortest is {length}"
+    return None
+
+def check_maze(name, cols, rows, seed, starts=DEFAULT_STARTS):
+    # -> ([(check, detail)], solver queries made)
+    grid = generate(name, cols, rows, random.Random(seed))
+    bad = []
+    ref = REFERENCES.get(name)
+    if ref and bytes(ref[0](cols, rows, random.Random(seed)).cells) != bytes(grid.cells):
+        bad.append(('reference', f"differs from {ref[1]}"))
+    a = np.frombuffer(bytes(grid.cells), dtype=np.uint8).reshape(rows, cols)
+    bad += check_walls(a)
+    if bad:
+        return bad, 0  # the solver checks below assume a well-formed maze
+    goal = (rows - 1, cols - 1)
+    dist = reference_distances(grid, goal)
+    if (dist < 0).any():
+        bad.append(('reachable', f"{np.count_nonzero(dist < 0)} cells cannot reach the goal"))
+        return bad, 0
+
+    bfs = DistanceField(grid, goal)
+    field = np.frombuffer(bfs.dist, dtype=np.int32).reshape(rows, cols)
+    if not np.array_equal(field, dist):
+        bad.append(('DistanceField', f"{np.count_nonzero(field != dist)} distances differ from BFS"))
+    # TreeField's next steps are the only ones a perfect maze has, so the BFS parents
+    tree_field = TreeField.build(grid, goal)
+    if tree_field is None:
+        bad.append(('TreeField', "build() rejected a perfect maze"))
+    else:
+        up = np.frombuffer(tree_field.up, dtype=np.uint8)
+        step = np.array([-cols, 1, cols, -1])
+        nxt = np.where(up < 4, np.arange(cols * rows) + step[up & 3], -1)
+        parent = np.frombuffer(bfs.parent, dtype=np.int32)
+        if not np.array_equal(nxt, parent):
+            bad.append(('TreeField', f"{np.count_nonzero(nxt != parent)} next steps differ from BFS"))
+    m = level_metrics(grid)
+    degree = np.array(DEGREE)[a]
+    expect = (int(dist[0, 0]), np.count_nonzero(degree == 1), np.count_nonzero(degree >= 3))
+    if (m.path_length, m.dead_ends, m.junctions) != expect:
+        bad.append(('level_metrics', f"{m[:3]} vs {expect}"))
+
+    # a_star to the goal, checked against the BFS distances
+    rng = random.Random(seed)
+    cells = [(r, c) for r in range(rows) for c in range(cols)]
+    picked = cells if not starts else [(0, 0)] + [rng.choice(cells) for _ in range(starts - 1)]
+    for st in picked:
+        err = check_path(a, a_star(st, goal, grid, cols, rows), st, goal, dist[st])
+        if err:
+            bad.append(('a_star', f"{st} -> goal: {err}"))
+            break
+    if tree_field and [tree_field.distance(st) for st in picked] != [int(dist[st]) for st in picked]:
+        bad.append(('TreeField', "distance() differs from BFS"))
+    # TreeIndex between arbitrary cells, checked against a_star
+    tree = TreeIndex.build(grid)
+    if tree is None:
+        bad.append(('TreeIndex', "build() rejected a perfect maze"))
+        return bad, len(picked)
+    pairs = [(rng.choice(cells), rng.choice(cells)) for _ in range(len(picked))]
+    lengths = [len(a_star(x, y, grid, cols, rows)) - 1 for x, y in pairs]
+    if [tree.distance(x, y) for x, y in pairs] != lengths:
+        bad.append(('TreeIndex', "distance() differs from a_star"))
+    elif tree.distances(pairs) != lengths:
+        bad.append(('TreeIndex', "batched distances() differs from distance()"))
+    for (x, y), n in zip(pairs, lengths):
+        err = check_path(a, tree.path(x, y), x, y, n)
+        if err:
+            bad.append(('TreeIndex', f"path {x} -> {y}: {err}"))
+            break
+    return bad, 2*len(picked)
+
+def check_batch(name, cols, rows, seeds, starts=DEFAULT_STARTS):
+    # one pool task; failures as (generator, cols, rows, seed, check, detail)
+    failures = []
+    queries = 0
+    for seed in seeds:
+        bad, q = check_maze(name, cols, rows, seed, starts)
+        queries += q
+        failures += [(name, cols, rows, seed, check, detail) for check, detail in bad]
+    return {'mazes': len(seeds), 'cells': len(seeds) * cols * rows, 'queries': queries}, failures
+
+# ---------- Sweep ----------
+def plan(generators, sizes, seeds, seed_start=0, levels=True):
+    # (generator, cols, rows, seeds) tasks: every generator x size x seed, plus the game's own levels
+    tasks = []
+    for name in generators:
+        for cols, rows in sizes:
+            for s in range(seed_start, seed_start + seeds, SEEDS_PER_TASK):
+                tasks.append((name, cols, rows, list(range(s, min(seed_start + seeds, s + SEEDS_PER_TASK)))))
+    if levels:
+        by_layout = {}
+        for difficulty in DIFFICULTIES:
+            for idx in range(NUM_LEVELS):
+                if level_algorithm(difficulty) not in generators:
+                    continue
+                key = (level_algorithm(difficulty), *generate_maze_cols_rows(idx, difficulty))
+                by_layout.setdefault(key, []).append(level_seed(idx))
+        tasks += [(*key, seed_list) for key, seed_list in by_layout.items()]
+    return tasks
+
+def run_checks(tasks, starts=DEFAULT_STARTS, workers=None):
+    # -> ({generator: counts}, failures); tasks spread over all cores
+    workers = workers or os.cpu_count() or 1
+    totals = {}
+    failures = []
+    def add(name, counts, bad):
+        t = totals.setdefault(name, {'mazes': 0, 'cells': 0, 'queries': 0, 'failures': 0})
+        for key, value in counts.items():
+            t[key] += value
+        t['failures'] += len(bad)
+        failures.extend(bad)
+    if workers == 1:
+        for name, cols, rows, seeds in tasks:
+            add(name, *check_batch(name, cols, rows, seeds, starts))
+        return totals, failures
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futures = [(name, ex.submit(check_batch, name, cols, rows, seeds, starts))
+                   for name, cols, rows, seeds in tasks]
+        for name, fut in futures:
+            add(name, *fut.result())
+    return totals, failures
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check maze generator and solver invariants over many seeds")
+    parser.add_argument('--generators', nargs='+', default=sorted(GENERATORS), choices=sorted(GENERATORS),
+                        metavar='NAME', help="(default: all registered)")
+    parser.add_argument('--seeds', type=int, default=DEFAULT_SEEDS,
+                        help="seeds per generator and size (default: %(default)s)")
+    parser.add_argument('--seed-start', type=int, default=0)
+    parser.add_argument('--size', nargs=2, type=int, metavar=('COLS', 'ROWS'),
+                        help="only this size (default: every level size)")
+    parser.add_argument('--starts', type=int, default=DEFAULT_STARTS,
+                        help="solver queries per maze, 0 = from every cell (default: %(default)s)")
+    parser.add_argument('--no-levels', action='store_true', help="skip the game's own %d levels per difficulty"
+                        % NUM_LEVELS)
+    parser.add_argument('--workers', type=int, default=0, help="processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    sizes = [tuple(args.size)] if args.size else check_sizes()
+    tasks = plan(args.generators, sizes, args.seeds, args.seed_start, levels=not (args.no_levels or args.size))
+    t = time.perf_counter()
+    totals, failures = run_checks(tasks, args.starts, args.workers or None)
+    dt = time.perf_counter() - t
+    for name, c in sorted(totals.items()):
+        print(f"{name:<12} {c['mazes']:>7} mazes {c['cells'] / 1e6:>7.2f}M cells {c['queries']:>8} solver queries "
+              f"{c['failures']:>4} failures")
+    mazes = sum(c['mazes'] for c in totals.values())
+    print(f"{mazes} mazes, {len(sizes)} sizes, {len(failures)} failures in {dt:.1f} s")
+    for name, cols, rows, seed, check, detail in failures[:MAX_FAILURES]:
+        print(f"FAIL {check}: {name} {cols}x{rows} seed {seed}: {detail}  "
+              f"(repro: --generators {name} --size {cols} {rows} --seed-start {seed} --seeds 1)", file=sys.stderr)
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,373 @@
+import random
+import threading
+import time
+from array import array
+from collections import deque, OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor
+
+from maze_grid import DR, DC, MazeGrid, wall_segments, wall_raster
+from maze_gen import NUM_LEVELS, DIFFICULTIES, eller_rows, generate_level_grid, level_seed
+from maze_solver import DistanceField, TreeField, TreeIndex, a_star, level_metrics
+import maze_pack
+
+# no pygame in here: bots, replays and tests run the game rules without a display
+
+# ---------- Config ----------
+LEVEL_CACHE_SIZE = 16  # built MazeLevels kept around, keyed by (idx, difficulty)
+
+# play area (px): decides which levels fit on screen and which scroll
+SCREEN_WIDTH = 900
+SCREEN_HEIGHT = 700
+PLAY_MARGIN_X = 40
+PLAY_MARGIN_Y = 100
+MIN_CELL = 6
+PLAY_W = SCREEN_WIDTH - 2*PLAY_MARGIN_X
+PLAY_H = SCREEN_HEIGHT - PLAY_MARGIN_Y - 40
+
+# huge mode: one big maze seen through a scrolling camera
+HUGE_LEVEL_IDX = -1
+HUGE_COLS = 2000
+HUGE_ROWS = 2000
+HUGE_ALGORITHM = 'eller'  # streams row by row (huge_grid, --stream-maze)
+HUGE_SECONDS_PER_STEP = 0.6  # time limit per cell of the shortest start->goal path
+
+# time limits for regular levels: walking the solution plus some exploring per dead end
+SECONDS_PER_STEP = 0.4
+SECONDS_PER_DEAD_END = 0.25
+
+# level previews / minimap: raster side cap in pixels (full 2*cols+1 detail below it)
+RASTER_MAX = 256
+
+# input codes passed to GameCore.recorder.log (maze_replay stores them as-is); moves use 0-3
+INPUT_HINT = 4
+INPUT_PAUSE = 5
+INPUT_RESUME = 6
+INPUT_END = 7
+
+# ---------- Maze Level ----------
+def huge_grid(seed, cols=HUGE_COLS, rows=HUGE_ROWS, cancel=None):
+    # the huge maze a row at a time, so a build whose cancel (threading.Event) is set
+    # stops within a row instead of finishing first
+    cells = array('B')
+    for row in eller_rows(cols, rows, random.Random(seed)):
+        if cancel is not None and cancel.is_set():
+            raise CancelledError
+        cells.frombytes(row)
+    return MazeGrid(cols, rows, cells)
+
+class MazeLevel:
+    def __init__(self, idx, difficulty, walls=None, seed=None, metrics=None):
+        self.idx = idx
+        self.difficulty = difficulty
+        self.seed = level_seed(idx) if seed is None else seed
+        if walls is None:
+            # generator picked per difficulty (DIFFICULTIES[...]['algorithm'])
+            walls = generate_level_grid(idx, difficulty)
+        # walls may be a view into a memory-mapped level pack
+        self.walls = walls
+        self.cols, self.rows = walls.cols, walls.rows
+        # too big to fit the play area (or huge mode): drawn through a camera, one window at a time
+        self.scrolling = (idx == HUGE_LEVEL_IDX or self.cols * MIN_CELL > PLAY_W
+                          or self.rows * MIN_CELL > PLAY_H)
+        self.start = (0,0)
+        self.goal = (self.rows-1, self.cols-1)
+        self._segments = None
+        self._goal_field = None
+        self._field_lock = threading.Lock()  # the field may be built on a worker while the game asks for it
+        self._tree_index = None
+        self._metrics = metrics  # maze_solver.LevelMetrics, from the level pack when it has them
+        self.hint_path = None
+        self.hint_used = 0
+    @classmethod
+    def huge(cls, difficulty, seed, walls=None, cancel=None, metrics=None):
+        # walls (and metrics) may come from a streamed single-level pack (--huge-pack);
+        # with its metrics known the level is ready without touching the whole maze
+        if walls is None:
+            walls = huge_grid(seed, cancel=cancel)
+        level = cls(HUGE_LEVEL_IDX, difficulty, walls, seed=seed, metrics=metrics)
+        if metrics is None:
+            level.build_goal_field(cancel)
+        return level.prepare()
+    @property
+    def segments(self):
+        # merged wall runs, shared by every renderer of this level
+        return self._segments or self.build_segments()
+    def build_segments(self):
+        if self._segments is None:
+            self._segments = wall_segments(self.walls)
+        return self._segments
+    @property
+    def goal_field(self):
+        # distances/next steps towards the goal; every hint is a walk over it
+        return self._goal_field or self.build_goal_field()
+    @property
+    def field_ready(self):
+        return self._goal_field is not None
+    def build_goal_field(self, cancel=None):
+        # a scrolling level's field is a TreeField (one byte per cell), everything else a BFS
+        with self._field_lock:
+            if self._goal_field is None:
+                field = TreeField.build(self.walls, self.goal, cancel) if self.scrolling else None
+                self._goal_field = field or DistanceField(self.walls, self.goal)
+        return self._goal_field
+    @property
+    def metrics(self):
+        return self._metrics or self.build_metrics()
+    def build_metrics(self):
+        if self._metrics is None:
+            self._metrics = level_metrics(self.walls, self.start, self.goal, self.goal_field)
+        return self._metrics
+    def prepare(self):
+        # do the per-level precomputation up front (called on a worker). A scrolling level
+        # whose metrics came with it leaves its field to build_goal_field, on demand.
+        if not self.scrolling:
+            self.build_goal_field()
+            self.build_segments()
+        self.build_metrics()
+        return self
+    def raster(self, max_side=RASTER_MAX):
+        # (width, height, pixels) for previews, see maze_grid.wall_raster
+        bw, bh = 2*self.cols + 1, 2*self.rows + 1
+        scale = min(1, max_side / max(bw, bh))
+        w, h = max(1, int(bw*scale)), max(1, int(bh*scale))
+        return w, h, wall_raster(self.walls, w, h)
+    def compute_hint(self, player_pos=None):
+        st = player_pos if player_pos else self.start
+        path = self.goal_field.path_from(st)
+        self.hint_path = deque(path) if path else None
+        return self.hint_path
+    def tree_index(self):
+        # LCA index for arbitrary cell-to-cell queries; None if the maze has loops
+        if self._tree_index is None:
+            self._tree_index = TreeIndex.build(self.walls) or False
+        return self._tree_index or None
+    def shortest_path(self, a, b):
+        tree = self.tree_index()
+        if tree:
+            return tree.path(a, b)
+        return a_star(a, b, self.walls, self.cols, self.rows)
+    def distance_to_goal(self, pos):
+        return self.goal_field.distance(pos)
+    def advance_hint(self, pos):
+        # keep a shown hint in step with the player instead of letting it go stale
+        path = self.hint_path
+        if not path:
+            return
+        if len(path) > 1 and path[1] == pos:
+            path.popleft()  # moved along the path
+        elif self.goal_field.next_cell(pos) == path[0]:
+            path.appendleft(pos)  # stepped off it; the way back joins the old path
+        else:
+            self.hint_path = deque(self.goal_field.path_from(pos) or ())
+
+# ---------- Level provider (lazy, LRU-cached, prefetching) ----------
+class LevelProvider:
+    def __init__(self, difficulty, capacity=LEVEL_CACHE_SIZE, pack=None):
+        self.difficulty = difficulty
+        self.capacity = capacity
+        self.pack = pack  # maze_pack.LevelPack, or None to generate on the fly
+        self._cache = OrderedDict()  # (idx, difficulty) -> MazeLevel, oldest first
+        self._pending = {}           # (idx, difficulty) -> Future being built in background
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='level-prefetch')
+
+    def __len__(self):
+        return NUM_LEVELS
+
+    def __getitem__(self, idx):
+        return self.get(idx)
+
+    def get(self, idx, difficulty=None):
+        key = (idx, difficulty or self.difficulty)
+        with self._lock:
+            lvl = self._cache.get(key)
+            if lvl is not None:
+                self._cache.move_to_end(key)
+                return lvl
+            fut = self._pending.get(key)
+        # already queued in the background: wait for it instead of building twice
+        lvl = fut.result() if fut is not None else self._build(*key)
+        self._store(key, lvl)
+        return lvl
+
+    def prefetch(self, idx, difficulty=None):
+        if not 0 <= idx < NUM_LEVELS:
+            return
+        key = (idx, difficulty or self.difficulty)
+        with self._lock:
+            if key in self._cache or key in self._pending:
+                return
+            fut = self._executor.submit(self._build, *key)
+            self._pending[key] = fut
+        fut.add_done_callback(lambda f, key=key: self._finish(key, f))
+
+    def _build(self, idx, difficulty):
+        pack = self.pack
+        if pack:
+            return MazeLevel(idx, difficulty, pack.grid(idx, difficulty), metrics=pack.metrics(idx, difficulty)).prepare()
+        return MazeLevel(idx, difficulty).prepare()
+
+    def submit(self, fn, *args):
+        # run other short level work (preview rasters) on the same worker; anything long
+        # would hold up the prefetch behind it
+        return self._executor.submit(fn, *args)
+
+    def _finish(self, key, fut):
+        with self._lock:
+            self._pending.pop(key, None)
+        if not fut.cancelled() and fut.exception() is None:
+            self._store(key, fut.result())
+
+    def _store(self, key, lvl):
+        with self._lock:
+            self._cache[key] = lvl
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.capacity:
+                self._cache.popitem(last=False)
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+# ---------- Game core ----------
+def monotonic_ms():
+    return int(time.monotonic() * 1000)
+
+def level_time_limit(level, difficulty):
+    # seconds allowed for a level, from its real solution length (level.metrics is computed
+    # on the prefetch worker or read from the pack, never in load_level)
+    m = level.metrics
+    if level.scrolling:
+        base_time = m.path_length * HUGE_SECONDS_PER_STEP
+    else:
+        base_time = m.path_length * SECONDS_PER_STEP + m.dead_ends * SECONDS_PER_DEAD_END
+    return int(base_time * DIFFICULTIES[difficulty]['time_mul'])
+
+class GameCore:
+    # movement, goal, timer, hints and the play states of one game. MazeGame draws it
+    # and feeds it input; bots, replays and tests drive it directly. clock() returns
+    # milliseconds, so a fake clock runs the timer at any speed.
+    # states: menu, playing, pause, timeup, level_complete (the UI adds its own screens)
+    def __init__(self, levels=None, difficulty='Normal', clock=monotonic_ms):
+        self.clock = clock
+        self.difficulty = difficulty
+        if levels is None:
+            levels = LevelProvider(difficulty, pack=maze_pack.open_pack())
+        self.levels = levels
+        self.state = 'menu'
+        self.level = None
+        self.level_idx = 0
+        self.pos = (0,0)
+        self.hints_left = DIFFICULTIES[difficulty]['hint']
+        self.time_left = 0
+        self.start_ms = 0
+        # paused time does not count against the level
+        self.paused_ms = 0
+        self.pause_start_ms = 0
+        # optional input log (maze_replay.InputRecorder): begin() per level, log(code, ms) per input
+        self.recorder = None
+
+    def set_difficulty(self, difficulty):
+        self.difficulty = difficulty
+        self.levels.difficulty = difficulty
+        self.levels.prefetch(self.level_idx)
+        self.hints_left = DIFFICULTIES[difficulty]['hint']
+
+    def load_level(self, idx, level=None):
+        if level is None:
+            level = self.levels[idx]
+        self.level = level
+        if not level.scrolling:
+            self.level_idx = idx
+            # build the next level while this one is being played
+            self.levels.prefetch(idx + 1)
+        self.pos = level.start
+        self.time_left = level_time_limit(level, self.difficulty)
+        self.start_ms = self.clock()
+        self.paused_ms = 0
+        self.hints_left = DIFFICULTIES[self.difficulty]['hint']
+        level.hint_used = 0
+        level.hint_path = None
+        self.state = 'playing'
+        if self.recorder:
+            self.recorder.begin(level, self.difficulty, self.start_ms)
+        return level
+
+    def restart(self):
+        return self.load_level(self.level_idx, self.level)
+
+    def next_level(self):
+        # False when there is none (last level, huge maze)
+        if self.level.scrolling or self.level_idx + 1 >= NUM_LEVELS:
+            return False
+        self.load_level(self.level_idx + 1)
+        return True
+
+    # ---- per-step rules ----
+    def move(self, d):
+        # d: 0=up 1=right 2=down 3=left (maze_grid); True if the player moved.
+        # Outer walls are always set, so a wall test is also the bounds test.
+        if self.state != 'playing':
+            return False
+        if self.recorder:
+            self.recorder.log(d, self.clock())
+        lvl = self.level
+        r, c = self.pos
+        if (lvl.walls.cells[r*lvl.cols + c] >> d) & 1:
+            return False
+        pos = self.pos = (r + DR[d], c + DC[d])
+        if lvl.hint_path:
+            lvl.advance_hint(pos)
+        if pos == lvl.goal:
+            self.state = 'level_complete'
+            if self.recorder:
+                self.recorder.log(INPUT_END, self.clock())
+        return True
+
+    def use_hint(self):
+        # shortest path from the player to the goal, or None when out of hints
+        if self.state != 'playing':
+            return None
+        if self.recorder:
+            self.recorder.log(INPUT_HINT, self.clock())
+        if self.hints_left <= 0:
+            return None
+        self.hints_left -= 1
+        self.level.hint_used += 1
+        return self.level.compute_hint(self.pos)
+
+    def pause(self):
+        if self.state == 'playing':
+            self.state = 'pause'
+            self.pause_start_ms = self.clock()
+            if self.recorder:
+                self.recorder.log(INPUT_PAUSE, self.pause_start_ms)
+
+    def resume(self):
+        if self.state == 'pause':
+            self.state = 'playing'
+            now = self.clock()
+            self.paused_ms += now - self.pause_start_ms
+            if self.recorder:
+                self.recorder.log(INPUT_RESUME, now)
+
+    # ---- timer ----
+    def play_ms(self):
+        # ms of play since the level started, pauses left out
+        now = self.pause_start_ms if self.state == 'pause' else self.clock()
+        return now - self.start_ms - self.paused_ms
+
+    def elapsed(self):
+        # whole seconds of play
+        return self.play_ms() // 1000
+
+    def time_remaining(self):
+        return max(0, self.time_left - self.elapsed())
+
+    def update(self):
+        # True on the tick the time runs out
+        if self.state == 'playing' and self.elapsed() > self.time_left:
+            self.state = 'timeup'
+            if self.recorder:
+                self.recorder.log(INPUT_END, self.clock())
+            return True
+        return False
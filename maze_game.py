@@ -1,28 +1,52 @@
 import pygame
 import sys
 import random
-import heapq
-from collections import deque
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import threading
 import os
+from itertools import islice
+
+from maze_grid import DR, DC, DIR_OF_DELTA, wall_segments
+from maze_gen import NUM_LEVELS, DIFFICULTIES, eller_rows
+import maze_pack
+from maze_core import (GameCore, MazeLevel, LevelProvider, level_time_limit, SCREEN_WIDTH, SCREEN_HEIGHT, PLAY_MARGIN_X,
+                       PLAY_MARGIN_Y, MIN_CELL, PLAY_W, PLAY_H, HUGE_LEVEL_IDX, HUGE_COLS, HUGE_ROWS, INPUT_HINT,
+                       INPUT_PAUSE, INPUT_RESUME)
+from maze_profiler import FrameProfiler
+from maze_replay import InputRecorder, read_replay, replay_level
 
 # ---------- Config ----------
-FPS = 60
-SCREEN_WIDTH = 900
-SCREEN_HEIGHT = 700
+FPS = 60  # default frame cap; 0 = uncapped
 TITLE = "Maze Runner - AJ Edition"
-NUM_LEVELS = 50
+HUGE_CELL = 20  # huge mode cell size (px); the maze scrolls under a fixed camera
 
-DIFFICULTIES = {
-    'Easy': {'scale': 1.0, 'time_mul': 1.2, 'hint': 3},
-    'Normal': {'scale': 1.2, 'time_mul': 1.0, 'hint': 2},
-    'Hard': {'scale': 1.5, 'time_mul': 0.8, 'hint': 1},
-}
+# redraw-on-demand: with nothing to draw, block on input for at most this long
+IDLE_TIMEOUT_MS = 1000
+LOADING_POLL_MS = 100
+
+# the simulation (timer, held keys, replays) runs in fixed TICK_MS steps on its own
+# clock, independent of the frame rate; frames interpolate between steps
+TICK_MS = 8              # 125 Hz
+MAX_CATCHUP_MS = 2000    # a longer stall (window drag, debugger) is not simulated
+SLIDE_MS = 60            # the player glides from cell to cell over this long
+
+TEXT_CACHE_SIZE = 512  # rendered text surfaces kept, least recently used dropped first
+
+# level select previews and the playing minimap (fitted into these boxes, aspect kept)
+THUMB_SIZE = (62, 60)
+MINIMAP_SIZE = (140, 84)
+
+# held movement keys: first repeat after MOVE_REPEAT_DELAY_MS, then one step every MOVE_REPEAT_MS
+MOVE_REPEAT_DELAY_MS = 200
+MOVE_REPEAT_MS = 100
 
 WHITE = (255,255,255)
 BLACK = (0,0,0)
 GRAY = (200,200,200)
 YELLOW = (220,200,60)
 BG = (12, 16, 22)
+MAZE_BG = (20,20,30)
 
 # controls: dr, dc (row, col)
 MOVE_KEYS = {
@@ -32,6 +56,9 @@ MOVE_KEYS = {
     pygame.K_RIGHT: (0, 1), pygame.K_d: (0, 1),
 }
 
+# let through in every state, whatever its handler table lists
+GLOBAL_EVENTS = (pygame.QUIT, pygame.KEYDOWN, pygame.WINDOWEXPOSED, pygame.WINDOWFOCUSLOST)
+
 AJ_MESSAGES = [
     "AJ IS PROUD OF YOU!",
     "AJ IS IMPRESSED!",
@@ -39,79 +66,34 @@ AJ_MESSAGES = [
     "AJ WILL GIVE YOU A COOKIE 🍪",
 ]
 
-# ---------- Maze generation (DFS recursive backtracker) ----------
-def generate_maze_cols_rows(level_idx, difficulty):
-    base = 15
-    add = level_idx // 5
-    scale = DIFFICULTIES[difficulty]['scale']
-    cols = int((base + add) * scale)
-    rows = int((base + add) * scale * 0.8)
-    cols = max(8, min(60, cols))
-    rows = max(6, min(48, rows))
-    return cols, rows
-
-def dfs_maze(cols, rows, seed=None):
-    random.seed(seed)
-    visited = [[False]*cols for _ in range(rows)]
-    walls = [[[True,True,True,True] for _ in range(cols)] for _ in range(rows)]
-    def neighbors(r,c):
-        res=[]
-        if r>0: res.append((r-1,c,0))
-        if c<cols-1: res.append((r,c+1,1))
-        if r<rows-1: res.append((r+1,c,2))
-        if c>0: res.append((r,c-1,3))
-        return res
-    stack=[(0,0)]
-    visited[0][0]=True
-    while stack:
-        r,c = stack[-1]
-        neigh = [(nr,nc,d) for (nr,nc,d) in neighbors(r,c) if not visited[nr][nc]]
-        if neigh:
-            nr,nc,d = random.choice(neigh)
-            walls[r][c][d]=False
-            opposite = (d+2)%4
-            walls[nr][nc][opposite]=False
-            visited[nr][nc]=True
-            stack.append((nr,nc))
-        else:
-            stack.pop()
-    return walls
-
-# ---------- A* pathfinder (used for hint) ----------
-def a_star(start, goal, walls, cols, rows):
-    def neighbors(r,c):
-        dirs = [(-1,0,0),(0,1,1),(1,0,2),(0,-1,3)]
-        for dr,dc,d in dirs:
-            nr, nc = r+dr, c+dc
-            if 0<=nr<rows and 0<=nc<cols and not walls[r][c][d]:
-                yield nr,nc
-    sx, sy = start
-    gx, gy = goal
-    open_set = []
-    heapq.heappush(open_set, (0, sx, sy))
-    came_from = {}
-    gscore = { (sx,sy): 0 }
-    def h(a,b):
-        return abs(a[0]-b[0]) + abs(a[1]-b[1])
-    while open_set:
-        _, r, c = heapq.heappop(open_set)
-        if (r,c) == (gx,gy):
-            path=[]
-            cur=(r,c)
-            while cur in came_from:
-                path.append(cur)
-                cur = came_from[cur]
-            path.append((sx,sy))
-            path.reverse()
-            return path
-        for nr,nc in neighbors(r,c):
-            tentative = gscore[(r,c)] + 1
-            if (nr,nc) not in gscore or tentative < gscore[(nr,nc)]:
-                gscore[(nr,nc)] = tentative
-                priority = tentative + h((nr,nc),(gx,gy))
-                heapq.heappush(open_set, (priority, nr, nc))
-                came_from[(nr,nc)] = (r,c)
-    return None
+# ---------- Fonts / text cache ----------
+# SysFont resolves the face against the system font list on every call; each
+# (face, size, bold) is looked up once and the Font shared from then on
+_fonts = {}
+
+def get_font(face, size, bold=False):
+    key = (face, size, bold)
+    font = _fonts.get(key)
+    if font is None:
+        font = _fonts[key] = pygame.font.SysFont(face, size, bold=bold)
+    return font
+
+# font.render is a rasterization; labels that do not change between frames are
+# rendered once and blitted from here. LRU so per-move strings (distance, time)
+# cannot grow it without bound.
+_text_cache = OrderedDict()
+
+def render_text(font, text, color, antialias=True):
+    key = (font, text, color, antialias)
+    surf = _text_cache.get(key)
+    if surf is None:
+        surf = font.render(text, antialias, color)
+        _text_cache[key] = surf
+        if len(_text_cache) > TEXT_CACHE_SIZE:
+            _text_cache.popitem(last=False)
+    else:
+        _text_cache.move_to_end(key)
+    return surf
 
 # ---------- UI Button ----------
 class Button:
@@ -124,10 +106,10 @@ class Button:
     def draw(self, surf, selected=False):
         pygame.draw.rect(surf, (48,52,70), self.rect, border_radius=8)
         pygame.draw.rect(surf, WHITE, self.rect, 2, border_radius=8)
-        txt = self.font.render(self.text, True, WHITE)
+        txt = render_text(self.font, self.text, WHITE)
         surf.blit(txt, txt.get_rect(center=self.rect.center))
         if selected:
-            arrow = self.font.render("▶", True, YELLOW)
+            arrow = render_text(self.font, "▶", YELLOW)
             ar = arrow.get_rect()
             ar.centery = self.rect.centery
             ar.right = self.rect.left - 12
@@ -137,49 +119,188 @@ class Button:
             if self.rect.collidepoint(ev.pos) and self.action:
                 self.action()
 
-# ---------- Maze Level ----------
-class MazeLevel:
-    def __init__(self, idx, difficulty):
-        self.idx = idx
-        self.difficulty = difficulty
-        self.cols, self.rows = generate_maze_cols_rows(idx, difficulty)
-        seed = (idx+1) * 12345
-        self.walls = dfs_maze(self.cols, self.rows, seed)
-        self.start = (0,0)
-        self.goal = (self.rows-1, self.cols-1)
-        self.hint_path = None
-        self.hint_used = 0
-    def compute_hint(self, player_pos=None):
-        st = player_pos if player_pos else self.start
-        path = a_star(st, self.goal, self.walls, self.cols, self.rows)
-        self.hint_path = path
-        return path
+# ---------- Thumbnails ----------
+def raster_surface(width, height, pixels, size):
+    # MazeLevel.raster() pixels (1 = wall) as a Surface fitted into size
+    surf = pygame.image.frombuffer(pixels, (width, height), 'P')
+    surf.set_palette([MAZE_BG, WHITE])
+    scale = min(size[0] / width, size[1] / height)
+    fit = (max(1, int(width*scale)), max(1, int(height*scale)))
+    # averaging keeps thin walls visible when shrinking; growing stays crisp
+    if scale < 1:
+        return pygame.transform.smoothscale(surf.convert(), fit)
+    return pygame.transform.scale(surf, fit).convert()
+
+class ThumbnailCache:
+    # level previews: rasters made on the level provider's worker, Surfaces made from them
+    # once per display size. Numbered levels' rasters are kept in path across runs; a huge
+    # maze's only until the next one. Only the main thread touches the dicts.
+    def __init__(self, levels, path=None):
+        self.levels = levels
+        self.path = path
+        self.rasters = None  # key -> (width, height, pixels); the file is read on first use
+        self.surfaces = {}   # (key, size) -> Surface
+        self.pending = {}    # key -> Future
+        self.dirty = False
+
+    def get(self, key, size, make):
+        # Surface for key fitted into size, or None while make() is still running
+        surf = self.surfaces.get((key, size))
+        if surf is not None:
+            return surf
+        if self.rasters is None:
+            self.rasters = maze_pack.read_thumbs(self.path) if self.path else {}
+        raster = self.rasters.get(key)
+        if raster is None:
+            if key not in self.pending:
+                self.pending[key] = self.levels.submit(make)
+            return None
+        surf = self.surfaces[(key, size)] = raster_surface(*raster, size)
+        return surf
+
+    def level(self, idx, difficulty, size):
+        return self.get((idx, difficulty), size, lambda: self._level_raster(idx, difficulty))
+
+    def _level_raster(self, idx, difficulty):
+        pack = self.levels.pack
+        return MazeLevel(idx, difficulty, pack.grid(idx, difficulty) if pack else None).raster()
+
+    def minimap(self, level, size):
+        if level.idx == HUGE_LEVEL_IDX:
+            return self.get((HUGE_LEVEL_IDX, level.seed), size, level.raster)
+        return self.level(level.idx, level.difficulty, size)
+
+    def poll(self):
+        # collect finished rasters; True if any landed (something new to draw)
+        done = [key for key, fut in self.pending.items() if fut.done()]
+        for key in done:
+            fut = self.pending.pop(key)
+            if fut.cancelled() or fut.exception() is not None:
+                continue
+            if key[0] == HUGE_LEVEL_IDX:
+                self.rasters = {k: v for k, v in self.rasters.items() if k[0] != HUGE_LEVEL_IDX}
+                self.surfaces = {k: v for k, v in self.surfaces.items() if k[0][0] != HUGE_LEVEL_IDX}
+            else:
+                self.dirty = True
+            self.rasters[key] = fut.result()
+        return bool(done)
+
+    def close(self):
+        if not (self.path and self.dirty):
+            return
+        try:
+            maze_pack.write_thumbs(self.path, {k: v for k, v in self.rasters.items() if k[0] != HUGE_LEVEL_IDX})
+        except OSError:
+            pass
+
+# ---------- Wall rendering ----------
+def draw_wall_segments(surf, segments, ox, oy, cell_w, cell_h, t, color=WHITE):
+    # segments come from wall_segments(); one draw call per straight run
+    line = pygame.draw.line
+    for x0, y0, x1, y1 in segments:
+        line(surf, color, (ox + x0*cell_w, oy + y0*cell_h), (ox + x1*cell_w, oy + y1*cell_h), t)
+
 
 # ---------- Main Game ----------
+def _core_attr(name):
+    # MazeGame attribute that lives on its GameCore
+    return property(lambda self: getattr(self.core, name), lambda self, value: setattr(self.core, name, value))
+
 class MazeGame:
-    def __init__(self):
-        pygame.init()
-        pygame.mixer.init()
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    # renderer and input adapter over a GameCore
+    state = _core_attr('state')
+    difficulty = _core_attr('difficulty')
+    current_level = _core_attr('level')
+    current_level_idx = _core_attr('level_idx')
+    player_pos = _core_attr('pos')
+    hints_left = _core_attr('hints_left')
+    time_left = _core_attr('time_left')
+
+    def __init__(self, huge_pack=None, trace=None, profile=False, continuous=False, record=None,
+                 move_repeat_ms=MOVE_REPEAT_MS, fps=FPS, vsync=False, thumb_cache=maze_pack.DEFAULT_THUMB_PATH):
+        # only what the first frame needs; audio comes up on a background thread
+        pygame.display.init()
+        pygame.font.init()
+        if vsync:
+            # SDL only syncs a renderer-backed window; presenting then waits for the display
+            try:
+                self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SCALED, vsync=1)
+                fps = 0
+            except pygame.error:
+                vsync = False
+        if not vsync:
+            self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption(TITLE)
+        self.fps = fps
         self.clock = pygame.time.Clock()
-        self.font = pygame.font.SysFont('Arial', 20)
-        self.title_font = pygame.font.SysFont('Arial', 36, bold=True)
+        self.clock.tick()  # also starts SDL's timer, which get_ticks() needs without pygame.init()
+        # fixed-step simulation clock (ms); GameCore, recordings and replays run on it
+        self.sim_ms = 0
+        self.sim_acc = 0
+        self.sim_last = pygame.time.get_ticks()
+        self.font = get_font('Arial', 20)
+        self.title_font = get_font('Arial', 36, bold=True)
+        self.small_font = get_font('Consolas,Courier New,monospace', 14)
         self.running = True
 
-        # Game state
-        self.state = 'menu'  # menu, playing, level_select, instructions, pause, timeup, level_complete
-        self.current_level_idx = 0
-        self.difficulty = 'Normal'
-        self.levels = [MazeLevel(i, self.difficulty) for i in range(NUM_LEVELS)]
-        self.player_pos = [0,0]
+        # frame-time profiler: F3 toggles the overlay, trace writes per-frame phase timings
+        self.profiler = FrameProfiler(trace_path=trace)
+        if profile:
+            self.profiler.toggle()
+
+        # Game state: the rules live in GameCore, timed by the simulation clock
+        self.levels = LevelProvider('Normal', pack=maze_pack.open_pack())
+        self.core = GameCore(self.levels, 'Normal', clock=self.sim_clock)
+        # core states plus the UI's own screens: level_select, instructions, loading
+        self.state = 'menu'
+        if self.levels.pack is None:
+            # missing or stale pack: generate on the fly now, rebuild it for next launch
+            threading.Thread(target=self._rebuild_pack, daemon=True).start()
+        self.levels.prefetch(self.current_level_idx)
         self.cell_w = 20
         self.cell_h = 20
-        self.margin_x = 40
-        self.margin_y = 100
-        self.hints_left = DIFFICULTIES[self.difficulty]['hint']
-        self.time_left = 0
-        self.level_start_ticks = 0
+        self.margin_x = PLAY_MARGIN_X
+        self.margin_y = PLAY_MARGIN_Y
+        # camera: top-left visible cell and visible cell counts (whole maze unless scrolling)
+        self.cam_r = 0
+        self.cam_c = 0
+        self.view_cols = 0
+        self.view_rows = 0
+        # huge mazes build on their own worker, so one never holds up level prefetching;
+        # huge_cancel stops the build in progress
+        self.huge_jobs = ThreadPoolExecutor(max_workers=1, thread_name_prefix='huge-maze')
+        self.huge_cancel = None
+        self.pending_level = None  # Future of a huge maze being generated
+        self.huge_field = None     # Future of the loaded huge maze's goal field, see load_level
+        # level select previews and the minimap; rasters persist in thumb_cache ('' = memory only)
+        self.thumbs = ThumbnailCache(self.levels, thumb_cache)
+        self.minimap_rect = None  # where the current level's minimap sits, once it is drawn
+        # pre-built huge maze (maze_pack.stream_level), read lazily through mmap
+        self.huge_pack = maze_pack.LevelPack(huge_pack) if huge_pack else None
+        # input recording (one replay file per level attempt) and replay playback
+        self.recorder = InputRecorder(record) if record else None
+        self.core.recorder = self.recorder
+        self.replay = None
+        self.replay_pos = 0
+
+        # redraw on demand: input, state changes and the HUD clock set needs_redraw;
+        # continuous=True restores the old redraw-every-frame loop
+        self.redraw_on_demand = not continuous
+        self.needs_redraw = True
+        self.drawn_state = None
+        self.hud_elapsed = -1
+
+        # cached static maze layer + rects drawn over it last frame
+        self.maze_layer = None
+        self.overlay_rects = []
+        self.update_rects = []
+        self.full_redraw = True
+        # last step's start cell and sim time while the player slides out of it
+        self.slide_from = None
+        self.slide_ms = 0
+        # modal popups: playing frame + dim overlay + popup text, composed once
+        self.modal_bg = None
+        self.modal_state = None
 
         # selection indexes for menus
         self.selection_index = 0
@@ -194,22 +315,48 @@ class MazeGame:
         # AJ message for current level complete
         self.aj_message = ""
 
-        # try load celebration sound
+        # celebration sound: None until the loader thread has it (or if there is none)
         self.win_sound = None
-        if os.path.isfile('win.wav'):
-            try:
-                self.win_sound = pygame.mixer.Sound('win.wav')
-            except Exception:
-                self.win_sound = None
+        threading.Thread(target=self._load_audio, daemon=True).start()
+
+        # held movement key: repeats while down, 0 turns repeating off
+        self.move_repeat_ms = move_repeat_ms
+        self.held_key = None
+        self.repeat_at = 0
+
+        # per-state input and draw tables; the event filter follows the state
+        self.filter_state = None
+        self.build_state_tables()
+
+    def sim_clock(self):
+        return self.sim_ms
+
+    def _load_audio(self):
+        # opening the audio device and decoding win.wav can take a while; the menu
+        # does not wait for it
+        if not os.path.isfile('win.wav'):
+            return
+        try:
+            pygame.mixer.init()
+            self.win_sound = pygame.mixer.Sound('win.wav')
+        except Exception:
+            self.win_sound = None
+
+    def _rebuild_pack(self):
+        try:
+            maze_pack.build_pack()
+        except OSError:
+            return
+        self.levels.pack = maze_pack.open_pack()
 
     # ---------- menu / button creators ----------
     def create_menu_buttons(self):
         self.buttons = []
-        bfont = pygame.font.SysFont('Arial', 24)
-        w = 220; h = 52; sx = SCREEN_WIDTH//2 - w//2; sy = 200; spacing = 74
+        bfont = get_font('Arial', 24)
+        w = 220; h = 52; sx = SCREEN_WIDTH//2 - w//2; sy = 170; spacing = 74
         labels = [('Play', self.start_play), ('Levels', self.open_level_select),
-                  ('Difficulty', self.toggle_difficulty), ('Instructions', self.open_instructions),
-                  ('Quit', self.quit_game)]
+                  ('Huge Maze', self.start_huge), ('Difficulty', self.toggle_difficulty),
+                  ('Instructions', self.open_instructions), ('Quit', self.quit_game)]
         for i,(lab,act) in enumerate(labels):
             self.buttons.append(Button((sx, sy + i*spacing, w, h), lab, action=act, font=bfont, idx=i))
 
@@ -220,13 +367,47 @@ class MazeGame:
     def open_level_select(self):
         self.state = 'level_select'
 
+    def start_huge(self):
+        # generation takes a while at this size; show the loading screen meanwhile
+        self.cancel_huge()
+        cancel = self.huge_cancel = threading.Event()
+        if self.huge_pack:
+            key = self.huge_pack.keys()[0]
+            self.pending_level = self.huge_jobs.submit(MazeLevel.huge, self.difficulty, self.huge_pack.seed(*key),
+                                                       self.huge_pack.grid(*key), cancel, self.huge_pack.metrics(*key))
+        else:
+            self.pending_level = self.huge_jobs.submit(MazeLevel.huge, self.difficulty, random.randrange(2**32),
+                                                       None, cancel)
+        self.state = 'loading'
+
+    def cancel_huge(self):
+        # drop a huge maze build (or its goal field); a running one stops at its next cancel check
+        if self.huge_cancel is not None:
+            self.huge_cancel.set()
+            self.huge_cancel = None
+        for job in (self.pending_level, self.huge_field):
+            if job is not None:
+                job.cancel()
+        self.pending_level = self.huge_field = None
+
+    def start_replay(self, replay):
+        # play a recording back in real time; its inputs drive the level until it runs out
+        level = replay_level(replay, self.levels, self.huge_pack)
+        self.core.set_difficulty(replay.difficulty)
+        self.core.recorder = None
+        self.load_level(replay.idx, level)
+        self.replay = replay
+        self.replay_pos = 0
+
+    def stop_replay(self):
+        self.replay = None
+        self.core.recorder = self.recorder
+
     def toggle_difficulty(self):
         keys = list(DIFFICULTIES.keys())
         idx = keys.index(self.difficulty)
         idx = (idx + 1) % len(keys)
-        self.difficulty = keys[idx]
-        self.levels = [MazeLevel(i, self.difficulty) for i in range(NUM_LEVELS)]
-        self.hints_left = DIFFICULTIES[self.difficulty]['hint']
+        self.core.set_difficulty(keys[idx])
 
     def open_instructions(self):
         self.state = 'instructions'
@@ -234,36 +415,72 @@ class MazeGame:
     def quit_game(self):
         self.running = False
 
-    def load_level(self, idx):
-        self.current_level_idx = idx
-        self.current_level = self.levels[idx]
-        self.player_pos = [self.current_level.start[0], self.current_level.start[1]]
+    def load_level(self, idx, level=None):
+        if level is not self.current_level:
+            self.cancel_huge()  # leaving a huge maze whose field may still be building
+        self.core.load_level(idx, level)
+        self.fit_level()
+        lvl = self.current_level
+        if not lvl.field_ready and self.huge_field is None:
+            # a huge maze that came with its metrics: the distance HUD and hints wait for this
+            self.huge_cancel = threading.Event()
+            self.huge_field = self.huge_jobs.submit(lvl.build_goal_field, self.huge_cancel)
+
+    def fit_level(self):
+        # screen layout for the level the core just loaded
+        level = self.current_level
         # compute tile sizes
-        max_w = SCREEN_WIDTH - 2*self.margin_x
-        max_h = SCREEN_HEIGHT - self.margin_y - 40
-        self.cell_w = max(6, min(40, max_w // self.current_level.cols))
-        self.cell_h = max(6, min(40, max_h // self.current_level.rows))
-        total_w = self.cell_w * self.current_level.cols
-        total_h = self.cell_h * self.current_level.rows
+        if level.scrolling:
+            self.cell_w = self.cell_h = HUGE_CELL
+            self.view_cols = min(level.cols, PLAY_W // HUGE_CELL)
+            self.view_rows = min(level.rows, PLAY_H // HUGE_CELL)
+        else:
+            self.cell_w = max(MIN_CELL, min(40, PLAY_W // level.cols))
+            self.cell_h = max(MIN_CELL, min(40, PLAY_H // level.rows))
+            self.view_cols, self.view_rows = level.cols, level.rows
+        self.cam_r = self.cam_c = 0
+        self.update_camera()
+        total_w = self.cell_w * self.view_cols
         self.margin_x = (SCREEN_WIDTH - total_w)//2
-        self.margin_y = 100
-        base_time = (self.current_level.cols * self.current_level.rows) // 6
-        self.time_left = int(base_time * DIFFICULTIES[self.difficulty]['time_mul'])
-        self.level_start_ticks = pygame.time.get_ticks()
-        self.hints_left = DIFFICULTIES[self.difficulty]['hint']
-        self.current_level.hint_used = 0
-        self.current_level.hint_path = None
+        self.margin_y = PLAY_MARGIN_Y
         self.selection_index = 0
         self.aj_message = random.choice(AJ_MESSAGES)
+        self.build_maze_layer()
+
+    # ---------- camera ----------
+    def update_camera(self):
+        # recentre once the player is within a quarter view of the edge; True if it moved
+        lvl = self.current_level
+        if not lvl.scrolling:
+            return False
+        r, c = self.player_pos
+        cam_r, cam_c = self.cam_r, self.cam_c
+        mr, mc = self.view_rows//4, self.view_cols//4
+        if not cam_r + mr <= r < cam_r + self.view_rows - mr:
+            cam_r = r - self.view_rows//2
+        if not cam_c + mc <= c < cam_c + self.view_cols - mc:
+            cam_c = c - self.view_cols//2
+        cam_r = max(0, min(lvl.rows - self.view_rows, cam_r))
+        cam_c = max(0, min(lvl.cols - self.view_cols, cam_c))
+        moved = (cam_r, cam_c) != (self.cam_r, self.cam_c)
+        self.cam_r, self.cam_c = cam_r, cam_c
+        return moved
+
+    def in_view(self, r, c):
+        return 0 <= r - self.cam_r < self.view_rows and 0 <= c - self.cam_c < self.view_cols
+
+    def cell_xy(self, r, c):
+        # screen position of a cell's top-left corner
+        return self.margin_x + (c - self.cam_c)*self.cell_w, self.margin_y + (r - self.cam_r)*self.cell_h
 
     # ---------- drawing ----------
     def draw_menu(self):
         self.screen.fill(BG)
-        title = self.title_font.render(TITLE, True, WHITE)
+        title = render_text(self.title_font, TITLE, WHITE)
         self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 60))
         for btn in self.buttons:
             btn.draw(self.screen, selected=False)
-        diff_txt = self.font.render(f"Difficulty: {self.difficulty}", True, WHITE)
+        diff_txt = render_text(self.font, f"Difficulty: {self.difficulty}", WHITE)
         self.screen.blit(diff_txt, (SCREEN_WIDTH - diff_txt.get_width() - 20, 20))
 
     def draw_instructions(self):
@@ -271,97 +488,197 @@ class MazeGame:
         lines = [
             "Instructions:",
             "- Use arrow keys or WASD to move from the green start to the red goal.",
-            "- Press H for a hint (A* path) - limited uses per level.",
+            "- Press H for a hint (shortest path) - limited uses per level.",
             "- Complete 50 levels. Mazes get larger and more complex.",
-            "- Press ESC to pause during play.",
+            "- Huge Maze: one giant maze, the view scrolls with you.",
+            "- Press ESC to pause during play. F3 shows frame timings.",
             "- Menus/buttons: Mouse OR Arrow keys + Enter."
         ]
         y = 80
         for i,l in enumerate(lines):
             f = self.title_font if i==0 else self.font
-            surf = f.render(l, True, WHITE)
+            surf = render_text(f, l, WHITE)
             self.screen.blit(surf, (40, y))
             y += 50 if i==0 else 34
 
     def draw_level_select(self):
         self.screen.fill(BG)
-        title = self.title_font.render("Select Level", True, WHITE)
+        title = render_text(self.title_font, "Select Level", WHITE)
         self.screen.blit(title, (SCREEN_WIDTH//2 - title.get_width()//2, 20))
-        cols_display = 10
-        btn_w, btn_h, spacing = 70, 36, 10
-        start_x = (SCREEN_WIDTH - (btn_w*cols_display + spacing*(cols_display-1)))//2
-        y0 = 120
         for i in range(NUM_LEVELS):
-            r = i // cols_display
-            c = i % cols_display
-            x = start_x + c*(btn_w + spacing)
-            rect = pygame.Rect(x, y0 + r*(btn_h + spacing), btn_w, btn_h)
+            rect = self.level_button_rect(i)
             color = (30,120,80) if i == self.current_level_idx else (40,40,80)
             pygame.draw.rect(self.screen, color, rect, border_radius=6)
-            txt = self.font.render(str(i+1), True, WHITE)
-            self.screen.blit(txt, txt.get_rect(center=rect.center))
-        hint = self.font.render("Click a level to play. ESC to return to menu.", True, WHITE)
+            txt = render_text(self.font, str(i+1), WHITE)
+            self.screen.blit(txt, txt.get_rect(midtop=(rect.centerx, rect.y + 4)))
+            # preview below the number; blank until its raster is ready
+            thumb = self.thumbs.level(i, self.difficulty, THUMB_SIZE)
+            if thumb:
+                area = pygame.Rect(rect.x + 4, rect.bottom - 4 - THUMB_SIZE[1], *THUMB_SIZE)
+                self.screen.blit(thumb, thumb.get_rect(center=area.center))
+        hint = render_text(self.font, "Click a level to play. ESC to return to menu.", WHITE)
         self.screen.blit(hint, (20, SCREEN_HEIGHT-40))
 
-    def draw_playing(self):
-        self.screen.fill(BG)
+    def level_button_rect(self, i):
+        cols_display = 10
+        btn_w, btn_h, spacing = 70, 92, 10
+        start_x = (SCREEN_WIDTH - (btn_w*cols_display + spacing*(cols_display-1)))//2
+        y0 = 100
+        r = i // cols_display
+        c = i % cols_display
+        return pygame.Rect(start_x + c*(btn_w + spacing), y0 + r*(btn_h + spacing), btn_w, btn_h)
+
+    def build_maze_layer(self):
+        # static part of the playing screen, rendered once per load_level
         lvl = self.current_level
+        layer = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT)).convert()
         # level background tint
         lvl_col = (50 + (lvl.idx*3)%200, 30 + (lvl.idx*5)%200, 60 + (lvl.idx*7)%180)
-        pygame.draw.rect(self.screen, lvl_col, (0,0,SCREEN_WIDTH,SCREEN_HEIGHT))
-
-        # draw maze cells & walls
-        for r in range(lvl.rows):
-            for c in range(lvl.cols):
-                x = self.margin_x + c*self.cell_w
-                y = self.margin_y + r*self.cell_h
-                cell_rect = pygame.Rect(x,y,self.cell_w,self.cell_h)
-                pygame.draw.rect(self.screen, (20,20,30), cell_rect)
-                walls = lvl.walls[r][c]
-                t = max(1, int(min(self.cell_w, self.cell_h)//6))
-                if walls[0]: pygame.draw.line(self.screen, WHITE, (x,y),(x+self.cell_w,y), t)
-                if walls[1]: pygame.draw.line(self.screen, WHITE, (x+self.cell_w,y),(x+self.cell_w,y+self.cell_h), t)
-                if walls[2]: pygame.draw.line(self.screen, WHITE, (x,y+self.cell_h),(x+self.cell_w,y+self.cell_h), t)
-                if walls[3]: pygame.draw.line(self.screen, WHITE, (x,y),(x,y+self.cell_h), t)
+        layer.fill(lvl_col)
+
+        # draw maze cells & walls (only the window the camera sees)
+        view_w = self.cell_w * self.view_cols
+        view_h = self.cell_h * self.view_rows
+        pygame.draw.rect(layer, MAZE_BG, (self.margin_x, self.margin_y, view_w, view_h))
+        if lvl.scrolling:
+            segments = wall_segments(lvl.walls, self.cam_r, self.cam_c, self.view_rows, self.view_cols)
+        else:
+            segments = lvl.segments
+        ox, oy = self.cell_xy(0, 0)
+        t = max(1, int(min(self.cell_w, self.cell_h)//6))
+        draw_wall_segments(layer, segments, ox, oy, self.cell_w, self.cell_h, t)
 
         # start & goal
-        sx = self.margin_x + lvl.start[1]*self.cell_w
-        sy = self.margin_y + lvl.start[0]*self.cell_h
-        gx = self.margin_x + lvl.goal[1]*self.cell_w
-        gy = self.margin_y + lvl.goal[0]*self.cell_h
-        pygame.draw.rect(self.screen, (50,200,80), (sx+3, sy+3, self.cell_w-6, self.cell_h-6), border_radius=4)
-        pygame.draw.rect(self.screen, (200,60,60), (gx+3, gy+3, self.cell_w-6, self.cell_h-6), border_radius=4)
+        for (r, c), col in ((lvl.start, (50,200,80)), (lvl.goal, (200,60,60))):
+            if self.in_view(r, c):
+                x, y = self.cell_xy(r, c)
+                pygame.draw.rect(layer, col, (x+3, y+3, self.cell_w-6, self.cell_h-6), border_radius=4)
+
+        self.maze_layer = layer
+        self.draw_minimap()
+        self.overlay_rects = []
+        self.full_redraw = True
+
+    def draw_minimap(self):
+        # the minimap's static part goes into the maze layer, so only the player marker
+        # costs anything per frame; update() calls this again if the raster was not ready
+        lvl = self.current_level
+        surf = self.thumbs.minimap(lvl, MINIMAP_SIZE)
+        if surf is None:
+            self.minimap_rect = None
+            return
+        layer = self.maze_layer
+        rect = self.minimap_rect = surf.get_rect(topright=(SCREEN_WIDTH - 10, 8))
+        layer.blit(surf, rect)
+        pygame.draw.rect(layer, GRAY, rect.inflate(2, 2), 1)
+        gx, gy = self.minimap_xy(*lvl.goal)
+        pygame.draw.rect(layer, (200,60,60), (gx - 1, gy - 1, 3, 3))
+        if lvl.scrolling:
+            # what the camera shows
+            x0, y0 = self.minimap_xy(self.cam_r, self.cam_c)
+            x1, y1 = self.minimap_xy(self.cam_r + self.view_rows, self.cam_c + self.view_cols)
+            pygame.draw.rect(layer, YELLOW, (x0, y0, max(2, x1 - x0), max(2, y1 - y0)), 1)
+        self.full_redraw = True
+
+    def minimap_xy(self, r, c):
+        # minimap pixel under the centre of cell (r, c); raster cells sit on odd pixels
+        lvl = self.current_level
+        rect = self.minimap_rect
+        return (rect.x + int((2*c + 1.5) * rect.w / (2*lvl.cols + 1)),
+                rect.y + int((2*r + 1.5) * rect.h / (2*lvl.rows + 1)))
+
+    def draw_playing(self):
+        lvl = self.current_level
+        self.modal_state = None  # the frame behind any popup is about to change
+        if self.full_redraw:
+            self.screen.blit(self.maze_layer, (0,0))
+            changed = [self.screen.get_rect()]
+        else:
+            # erase last frame's overlays by restoring the static layer under them
+            for rect in self.overlay_rects:
+                self.screen.blit(self.maze_layer, rect, rect)
+            changed = list(self.overlay_rects)
+        drawn = []
 
         # hint path highlight (if present)
         if lvl.hint_path:
-            for (pr,pc) in lvl.hint_path:
-                hx = self.margin_x + pc*self.cell_w
-                hy = self.margin_y + pr*self.cell_h
+            path = lvl.hint_path
+            if lvl.scrolling:
+                # a huge maze's path dwarfs the screen; only its next stretch can be in view
+                path = islice(path, self.view_rows*self.view_cols)
+            for (pr,pc) in path:
+                if not self.in_view(pr, pc):
+                    continue
+                hx, hy = self.cell_xy(pr, pc)
                 inner = pygame.Rect(hx+int(self.cell_w*0.25), hy+int(self.cell_h*0.25), int(self.cell_w*0.5), int(self.cell_h*0.5))
-                pygame.draw.rect(self.screen, (200,180,60), inner, border_radius=4)
+                drawn.append(pygame.draw.rect(self.screen, (200,180,60), inner, border_radius=4))
 
         # player
-        px = self.margin_x + self.player_pos[1]*self.cell_w
-        py = self.margin_y + self.player_pos[0]*self.cell_h
-        pygame.draw.circle(self.screen, (80,180,255), (px + self.cell_w//2, py + self.cell_h//2), max(6, min(self.cell_w, self.cell_h)//3))
+        px, py = self.cell_xy(*self.player_draw_pos())
+        drawn.append(pygame.draw.circle(self.screen, (80,180,255), (px + self.cell_w//2, py + self.cell_h//2), max(6, min(self.cell_w, self.cell_h)//3)))
+        if self.minimap_rect:
+            mx, my = self.minimap_xy(*self.player_draw_pos())
+            drawn.append(pygame.draw.rect(self.screen, (80,180,255), (mx - 2, my - 2, 4, 4)))
 
         # HUD
         hud_y = 12
-        self.screen.blit(self.font.render(f"Level {lvl.idx+1}/{NUM_LEVELS}", True, WHITE), (20,hud_y))
-        self.screen.blit(self.font.render(f"Difficulty: {self.difficulty}", True, WHITE), (220,hud_y))
-        self.screen.blit(self.font.render(f"Hints left: {self.hints_left}", True, WHITE), (420,hud_y))
-        elapsed = (pygame.time.get_ticks() - self.level_start_ticks) // 1000
-        tleft = max(0, self.time_left - elapsed)
-        self.screen.blit(self.font.render(f"Time: {tleft}s", True, WHITE), (620,hud_y))
+        level_txt = "Huge maze" if lvl.scrolling else f"Level {lvl.idx+1}/{NUM_LEVELS}"
+        drawn.append(self.screen.blit(render_text(self.font, level_txt, WHITE), (20,hud_y)))
+        drawn.append(self.screen.blit(render_text(self.font, f"Difficulty: {self.difficulty}", WHITE), (220,hud_y)))
+        drawn.append(self.screen.blit(render_text(self.font, f"Hints left: {self.hints_left}", WHITE), (420,hud_y)))
+        tleft = self.core.time_remaining()
+        drawn.append(self.screen.blit(render_text(self.font, f"Time: {tleft}s", WHITE), (620,hud_y)))
+        dist = lvl.distance_to_goal(self.player_pos) if lvl.field_ready else "measuring..."
+        drawn.append(self.screen.blit(render_text(self.font, f"Distance to goal: {dist}", WHITE), (20,hud_y+34)))
+
+        self.overlay_rects = drawn
+        changed.extend(drawn)
+        self.update_rects = changed
+        self.full_redraw = False
+        if self.slide_from is not None:
+            self.needs_redraw = True  # mid-slide: keep drawing until it lands
+
+    def player_draw_pos(self):
+        # (row, col), fractional while sliding; sim_acc is the real time not yet simulated
+        r, c = self.player_pos
+        if self.slide_from is None:
+            return r, c
+        t = (self.sim_ms + self.sim_acc - self.slide_ms) / SLIDE_MS
+        if t >= 1:
+            self.slide_from = None
+            return r, c
+        fr, fc = self.slide_from
+        return fr + (r - fr)*t, fc + (c - fc)*t
+
+    def draw_loading(self):
+        self.screen.fill(BG)
+        msg = render_text(self.title_font, "Generating huge maze...", WHITE)
+        self.screen.blit(msg, (SCREEN_WIDTH//2 - msg.get_width()//2, 260))
+        sub = render_text(self.font, f"{HUGE_COLS} x {HUGE_ROWS} cells - ESC to cancel", GRAY)
+        self.screen.blit(sub, (SCREEN_WIDTH//2 - sub.get_width()//2, 320))
+
+    def draw_modal_backdrop(self, alpha, texts):
+        # first frame of a popup: snapshot the playing frame with the dim overlay and the
+        # popup's static text baked in; afterwards every frame is one blit plus the buttons
+        if self.modal_state != self.state:
+            self.full_redraw = True
+            self.slide_from = None  # the frozen frame shows the player on its cell
+            self.draw_playing()
+            bg = self.screen.copy()
+            dim = pygame.Surface(bg.get_size(), pygame.SRCALPHA)
+            dim.fill((0,0,0,alpha))
+            bg.blit(dim, (0,0))
+            for font, text, color, y in texts:
+                surf = render_text(font, text, color)
+                bg.blit(surf, (SCREEN_WIDTH//2 - surf.get_width()//2, y))
+            self.modal_bg = bg
+            self.modal_state = self.state
+        self.screen.blit(self.modal_bg, (0,0))
 
     def draw_pause(self):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0,0,0,180))
-        self.screen.blit(overlay, (0,0))
-        msg = self.title_font.render("Paused", True, WHITE)
-        self.screen.blit(msg, (SCREEN_WIDTH//2 - msg.get_width()//2, 120))
+        self.draw_modal_backdrop(180, [(self.title_font, "Paused", WHITE, 120)])
         if not self.pause_buttons:
-            bfont = pygame.font.SysFont('Arial', 24)
+            bfont = get_font('Arial', 24)
             w = 280; h = 56; sx = SCREEN_WIDTH//2 - w//2
             self.pause_buttons = [
                 Button((sx, 220, w, h), "Resume", action=self._action_resume, font=bfont, idx=0),
@@ -372,13 +689,9 @@ class MazeGame:
             btn.draw(self.screen, selected=(i == self.selection_index))
 
     def draw_timeup(self):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0,0,0,220))
-        self.screen.blit(overlay, (0,0))
-        msg = self.title_font.render("TIME'S UP! YOU ARE TOO SLOW", True, WHITE)
-        self.screen.blit(msg, (SCREEN_WIDTH//2 - msg.get_width()//2, 140))
+        self.draw_modal_backdrop(220, [(self.title_font, "TIME'S UP! YOU ARE TOO SLOW", WHITE, 140)])
         if not self.timeup_buttons:
-            bfont = pygame.font.SysFont('Arial', 24)
+            bfont = get_font('Arial', 24)
             w = 280; h = 56; sx = SCREEN_WIDTH//2 - w//2
             self.timeup_buttons = [
                 Button((sx, 260, w, h), "Restart", action=self._action_restart, font=bfont, idx=0),
@@ -388,15 +701,10 @@ class MazeGame:
             btn.draw(self.screen, selected=(i == self.selection_index))
 
     def draw_level_complete(self):
-        overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        overlay.fill((0,0,0,200))
-        self.screen.blit(overlay, (0,0))
-        msg = self.title_font.render("🎉 WOW! LEVEL COMPLETED 🎉", True, WHITE)
-        self.screen.blit(msg, (SCREEN_WIDTH//2 - msg.get_width()//2, 110))
-        sub = self.font.render(self.aj_message, True, YELLOW)
-        self.screen.blit(sub, (SCREEN_WIDTH//2 - sub.get_width()//2, 170))
+        self.draw_modal_backdrop(200, [(self.title_font, "🎉 WOW! LEVEL COMPLETED 🎉", WHITE, 110),
+                                       (self.font, self.aj_message, YELLOW, 170)])
         if not self.levelcomplete_buttons:
-            bfont = pygame.font.SysFont('Arial', 24)
+            bfont = get_font('Arial', 24)
             w = 280; h = 56; sx = SCREEN_WIDTH//2 - w//2
             self.levelcomplete_buttons = [
                 Button((sx, 240, w, h), "Replay Level", action=self._action_restart, font=bfont, idx=0),
@@ -408,13 +716,12 @@ class MazeGame:
 
     # ---------- actions ----------
     def _action_resume(self):
-        self.state = 'playing'
+        self.core.resume()
         self.selection_index = 0
 
     def _action_restart(self):
         # replay current level
-        self.load_level(self.current_level_idx)
-        self.state = 'playing'
+        self.load_level(self.current_level_idx, self.current_level)
         self.selection_index = 0
         # clear popups
         self.levelcomplete_buttons = []
@@ -422,6 +729,8 @@ class MazeGame:
         self.pause_buttons = []
 
     def _action_mainmenu(self):
+        # also F1 from any screen, the loading one included
+        self.cancel_huge()
         self.state = 'menu'
         self.selection_index = 0
         # clear popups
@@ -430,154 +739,182 @@ class MazeGame:
         self.pause_buttons = []
 
     def _action_next_level(self):
-        # proceed to next level
-        if self.current_level_idx + 1 < NUM_LEVELS:
-            self.load_level(self.current_level_idx + 1)
-            self.state = 'playing'
+        # proceed to next level (a huge maze has none)
+        if self.core.next_level():
+            self.fit_level()
         else:
+            self.cancel_huge()
             self.state = 'menu'
         self.selection_index = 0
         self.levelcomplete_buttons = []
 
     # ---------- event handling ----------
-    def handle_events(self):
-        for ev in pygame.event.get():
-            if ev.type == pygame.QUIT:
+    def build_state_tables(self):
+        # state -> {event type: handler(ev)}: one dict lookup per event, and a state
+        # never sees an event type it does not list
+        popup = {pygame.KEYDOWN: self._popup_key, pygame.MOUSEBUTTONDOWN: self._popup_click}
+        self.state_handlers = {
+            'menu': {pygame.KEYDOWN: self._menu_key, pygame.MOUSEBUTTONDOWN: self._menu_click},
+            'instructions': {pygame.KEYDOWN: self._escape_to_menu, pygame.MOUSEBUTTONDOWN: self._click_to_menu},
+            'level_select': {pygame.KEYDOWN: self._escape_to_menu, pygame.MOUSEBUTTONDOWN: self._level_select_click},
+            'loading': {pygame.KEYDOWN: self._loading_key},
+            'playing': {pygame.KEYDOWN: self._playing_key, pygame.KEYUP: self._playing_keyup},
+            'pause': {**popup, pygame.KEYDOWN: self._pause_key},
+            'timeup': popup,
+            'level_complete': popup,
+        }
+        self.global_keys = {pygame.K_F1: self._action_mainmenu, pygame.K_F3: self.profiler.toggle}
+        self.window_handlers = {pygame.WINDOWEXPOSED: self._on_expose, pygame.WINDOWFOCUSLOST: self._on_focus_lost}
+        self.drawers = {
+            'menu': self.draw_menu,
+            'instructions': self.draw_instructions,
+            'level_select': self.draw_level_select,
+            'loading': self.draw_loading,
+            'playing': self.draw_playing,
+            'pause': self.draw_pause,
+            'timeup': self.draw_timeup,
+            'level_complete': self.draw_level_complete,
+        }
+
+    def apply_event_filter(self):
+        # SDL drops every other event type before it is queued, mouse motion floods included
+        pygame.event.set_blocked(None)
+        pygame.event.set_allowed(list(set(GLOBAL_EVENTS) | set(self.state_handlers[self.state])))
+        self.filter_state = self.state
+        if self.state != 'playing':
+            self.held_key = None  # its KEYUP is filtered out from here on
+
+    def handle_events(self, events=None):
+        if self.state != self.filter_state:
+            self.apply_event_filter()
+        handlers = self.state_handlers
+        for ev in (pygame.event.get() if events is None else events):
+            t = ev.type
+            if t != pygame.MOUSEMOTION:
+                # nothing reacts to bare pointer motion; everything else may change the screen
+                self.needs_redraw = True
+            if t == pygame.QUIT:
                 self.running = False
                 return
+            if t == pygame.KEYDOWN and ev.key in self.global_keys:
+                self.global_keys[ev.key]()
+                continue
+            if t in self.window_handlers:
+                self.window_handlers[t](ev)
+                continue
 
-            # GLOBAL debug shortcut
-            if ev.type == pygame.KEYDOWN and ev.key == pygame.K_F1:
-                self.state = 'menu'
+            # REPLAY: the recording is the input; ESC leaves
+            if self.replay is not None and self.state in ('playing', 'pause'):
+                if t == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
+                    self.stop_replay()
+                    self.cancel_huge()
+                    self.state = 'menu'
+                continue
 
-            # MENU
-            if self.state == 'menu':
-                for b in self.buttons:
-                    b.handle_event(ev)
-                if ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
-                    self.running = False
+            handler = handlers[self.state].get(t)
+            if handler is not None:
+                handler(ev)
 
-            # INSTRUCTIONS
-            elif self.state == 'instructions':
-                if ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
-                    self.state = 'menu'
-                if ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
-                    self.state = 'menu'
+    def _on_expose(self, ev):
+        self.full_redraw = True
 
-            # LEVEL SELECT
-            elif self.state == 'level_select':
-                if ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
-                    mx,my = ev.pos
-                    cols_display = 10
-                    btn_w, btn_h, spacing = 70, 36, 10
-                    start_x = (SCREEN_WIDTH - (btn_w*cols_display + spacing*(cols_display-1)))//2
-                    y0 = 120
-                    for i in range(NUM_LEVELS):
-                        r = i // cols_display
-                        c = i % cols_display
-                        x = start_x + c*(btn_w + spacing)
-                        rect = pygame.Rect(x, y0 + r*(btn_h + spacing), btn_w, btn_h)
-                        if rect.collidepoint((mx,my)):
-                            self.load_level(i)
-                            self.state = 'playing'
-                            break
-                if ev.type == pygame.KEYDOWN and ev.key == pygame.K_ESCAPE:
-                    self.state = 'menu'
+    def _on_focus_lost(self, ev):
+        self.held_key = None  # the KEYUP goes to whichever window has focus now
 
-            # PLAYING
-            elif self.state == 'playing':
-                if ev.type == pygame.KEYDOWN:
-                    if ev.key == pygame.K_ESCAPE:
-                        self.state = 'pause'
-                        self.selection_index = 0
-                    elif ev.key == pygame.K_h:
-                        if self.hints_left > 0:
-                            player_cell = (self.player_pos[0], self.player_pos[1])
-                            self.current_level.compute_hint(player_pos=player_cell)
-                            self.hints_left -= 1
-                            self.current_level.hint_used += 1
-                    elif ev.key in MOVE_KEYS:
-                        dr,dc = MOVE_KEYS[ev.key]
-                        self.try_move(dr,dc)
-                # clicking in playing area does nothing (but could be extended)
-
-            # PAUSE
-            elif self.state == 'pause':
-                if ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
-                    for b in self.pause_buttons:
-                        b.handle_event(ev)
-                if ev.type == pygame.KEYDOWN:
-                    if ev.key == pygame.K_ESCAPE:
-                        self.state = 'playing'
-                    elif ev.key in (pygame.K_UP, pygame.K_w):
-                        if self.pause_buttons:
-                            self.selection_index = (self.selection_index - 1) % len(self.pause_buttons)
-                    elif ev.key in (pygame.K_DOWN, pygame.K_s):
-                        if self.pause_buttons:
-                            self.selection_index = (self.selection_index + 1) % len(self.pause_buttons)
-                    elif ev.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
-                        idx = self.selection_index
-                        if 0 <= idx < len(self.pause_buttons):
-                            action = self.pause_buttons[idx].action
-                            if action: action()
-
-            # TIMEUP
-            elif self.state == 'timeup':
-                if ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
-                    for b in self.timeup_buttons:
-                        b.handle_event(ev)
-                if ev.type == pygame.KEYDOWN:
-                    if ev.key in (pygame.K_UP, pygame.K_w):
-                        if self.timeup_buttons:
-                            self.selection_index = (self.selection_index - 1) % len(self.timeup_buttons)
-                    elif ev.key in (pygame.K_DOWN, pygame.K_s):
-                        if self.timeup_buttons:
-                            self.selection_index = (self.selection_index + 1) % len(self.timeup_buttons)
-                    elif ev.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
-                        idx = self.selection_index
-                        if 0 <= idx < len(self.timeup_buttons):
-                            action = self.timeup_buttons[idx].action
-                            if action: action()
-
-            # LEVEL COMPLETE
-            elif self.state == 'level_complete':
-                if ev.type == pygame.MOUSEBUTTONDOWN and ev.button == 1:
-                    for b in self.levelcomplete_buttons:
-                        b.handle_event(ev)
-                if ev.type == pygame.KEYDOWN:
-                    if ev.key in (pygame.K_UP, pygame.K_w):
-                        if self.levelcomplete_buttons:
-                            self.selection_index = (self.selection_index - 1) % len(self.levelcomplete_buttons)
-                    elif ev.key in (pygame.K_DOWN, pygame.K_s):
-                        if self.levelcomplete_buttons:
-                            self.selection_index = (self.selection_index + 1) % len(self.levelcomplete_buttons)
-                    elif ev.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
-                        idx = self.selection_index
-                        if 0 <= idx < len(self.levelcomplete_buttons):
-                            action = self.levelcomplete_buttons[idx].action
-                            if action: action()
+    def _menu_key(self, ev):
+        if ev.key == pygame.K_ESCAPE:
+            self.running = False
+
+    def _menu_click(self, ev):
+        for b in self.buttons:
+            b.handle_event(ev)
+
+    def _escape_to_menu(self, ev):
+        if ev.key == pygame.K_ESCAPE:
+            self.state = 'menu'
+
+    def _click_to_menu(self, ev):
+        if ev.button == 1:
+            self.state = 'menu'
+
+    def _level_select_click(self, ev):
+        if ev.button != 1:
+            return
+        for i in range(NUM_LEVELS):
+            if self.level_button_rect(i).collidepoint(ev.pos):
+                self.load_level(i)
+                self.state = 'playing'
+                break
+
+    def _loading_key(self, ev):
+        if ev.key == pygame.K_ESCAPE:
+            self.cancel_huge()
+            self.state = 'menu'
+
+    def _playing_key(self, ev):
+        if ev.key == pygame.K_ESCAPE:
+            self.core.pause()
+            self.selection_index = 0
+        elif ev.key == pygame.K_h:
+            if self.current_level.field_ready:  # not while a huge maze's field is building
+                self.core.use_hint()
+        elif ev.key in MOVE_KEYS:
+            self.held_key = ev.key
+            self.repeat_at = self.sim_ms + MOVE_REPEAT_DELAY_MS
+            self.try_move(*MOVE_KEYS[ev.key])
+
+    def _playing_keyup(self, ev):
+        if ev.key == self.held_key:
+            self.held_key = None
+
+    def popup_buttons(self):
+        return {'pause': self.pause_buttons, 'timeup': self.timeup_buttons,
+                'level_complete': self.levelcomplete_buttons}[self.state]
+
+    def _popup_click(self, ev):
+        if ev.button == 1:
+            for b in self.popup_buttons():
+                b.handle_event(ev)
+
+    def _popup_key(self, ev):
+        # arrow / WASD selection and Enter, the same for every popup
+        buttons = self.popup_buttons()
+        if not buttons:
+            return
+        if ev.key in (pygame.K_UP, pygame.K_w):
+            self.selection_index = (self.selection_index - 1) % len(buttons)
+        elif ev.key in (pygame.K_DOWN, pygame.K_s):
+            self.selection_index = (self.selection_index + 1) % len(buttons)
+        elif ev.key in (pygame.K_RETURN, pygame.K_KP_ENTER):
+            idx = self.selection_index
+            if 0 <= idx < len(buttons):
+                action = buttons[idx].action
+                if action: action()
+
+    def _pause_key(self, ev):
+        if ev.key == pygame.K_ESCAPE:
+            self.core.resume()
+        else:
+            self._popup_key(ev)
 
     # ---------- movement logic ----------
     def try_move(self, dr, dc):
-        r,c = self.player_pos
-        nr, nc = r + dr, c + dc
-        lvl = self.current_level
-        if not (0 <= nr < lvl.rows and 0 <= nc < lvl.cols):
-            return
-        dir_map = {(-1,0):0, (0,1):1, (1,0):2, (0,-1):3}
-        d = dir_map.get((dr,dc))
+        d = DIR_OF_DELTA.get((dr,dc))
         if d is None: return
-        if not lvl.walls[r][c][d]:
-            self.player_pos = [nr, nc]
+        prev = self.player_pos
+        if self.core.move(d):
+            self.slide_from = prev
+            self.slide_ms = self.sim_ms
+            if self.update_camera():
+                self.build_maze_layer()
             # reached goal => show level complete popup (do NOT immediately auto-load)
-            if (nr, nc) == lvl.goal:
+            if self.state == 'level_complete':
                 # play win sound if available
                 if self.win_sound:
                     try:
                         self.win_sound.play()
                     except Exception:
                         pass
-                self.state = 'level_complete'
                 self.selection_index = 0
                 self.levelcomplete_buttons = []
                 # aj message already picked in load_level; ensure one exists
@@ -585,47 +922,227 @@ class MazeGame:
                     self.aj_message = random.choice(AJ_MESSAGES)
 
     # ---------- update ----------
-    def update(self):
+    def step_replay(self):
+        # apply every recorded input that is due by now
+        if self.state not in ('playing', 'pause'):
+            self.stop_replay()  # finished; the popup takes over
+            return
+        events = self.replay.events
+        now = self.sim_ms - self.core.start_ms
+        i = self.replay_pos
+        while i < len(events) and events[i][0] <= now:
+            code = events[i][1]
+            if code < INPUT_HINT:
+                self.try_move(DR[code], DC[code])
+            elif code == INPUT_HINT:
+                self.core.use_hint()
+            elif code == INPUT_PAUSE:
+                self.core.pause()
+            elif code == INPUT_RESUME:
+                self.core.resume()
+            i += 1
+        if i != self.replay_pos:
+            self.replay_pos = i
+            self.needs_redraw = True
+
+    def tick(self):
+        # one fixed simulation step
+        self.sim_ms += TICK_MS
+        if self.replay is not None:
+            self.step_replay()
         if self.state == 'playing':
-            elapsed = (pygame.time.get_ticks() - self.level_start_ticks) // 1000
-            if elapsed > self.time_left:
+            if self.held_key is not None and self.move_repeat_ms and self.sim_ms >= self.repeat_at:
+                self.repeat_at = self.sim_ms + self.move_repeat_ms
+                self.try_move(*MOVE_KEYS[self.held_key])
+                self.needs_redraw = True
+            if self.core.update():
                 # time up
-                self.state = 'timeup'
                 self.selection_index = 0
                 self.timeup_buttons = []
 
+    def advance(self):
+        # catch the simulation up with real time in whole ticks. A slow frame runs several
+        # ticks, so a weak machine loses frames, never game time.
+        now = pygame.time.get_ticks()
+        self.sim_acc += min(now - self.sim_last, MAX_CATCHUP_MS)
+        self.sim_last = now
+        while self.sim_acc >= TICK_MS:
+            self.sim_acc -= TICK_MS
+            self.tick()
+
+    def update(self):
+        # per frame: things that only change what is drawn
+        if self.thumbs.poll():
+            self.needs_redraw = True
+            if self.minimap_rect is None and self.maze_layer is not None:
+                self.draw_minimap()
+        if self.huge_field is not None and self.huge_field.done():
+            self.huge_field = None
+            self.needs_redraw = True  # distance to goal can be shown
+        if self.state == 'loading':
+            if self.pending_level.done():
+                level = self.pending_level.result()
+                self.pending_level = None
+                self.load_level(None, level)
+                self.state = 'playing'
+        elif self.state == 'playing':
+            elapsed = self.core.elapsed()
+            if elapsed != self.hud_elapsed:
+                # HUD clock ticks over once a second
+                self.hud_elapsed = elapsed
+                self.needs_redraw = True
+
     # ---------- main loop ----------
+    def idle_timeout(self):
+        # ms until something changes on screen without input
+        if self.state == 'loading':
+            return LOADING_POLL_MS
+        timeout = IDLE_TIMEOUT_MS
+        if self.state == 'playing':
+            timeout = 1000 - self.core.play_ms() % 1000
+            if self.held_key is not None and self.move_repeat_ms:
+                timeout = max(1, min(timeout, self.repeat_at - self.sim_ms))
+        if self.thumbs.pending or self.huge_field is not None:
+            timeout = min(timeout, LOADING_POLL_MS)  # previews or a goal field still coming in
+        if self.replay is not None and self.replay_pos < len(self.replay.events):
+            due = self.replay.events[self.replay_pos][0] - (self.sim_ms - self.core.start_ms)
+            timeout = max(1, min(timeout, due))  # event.wait(0) would block forever
+        return timeout
+
+    def wait_events(self):
+        # block until input or the next scheduled redraw instead of spinning at FPS
+        ev = pygame.event.wait(self.idle_timeout())
+        events = [] if ev.type == pygame.NOEVENT else [ev]
+        events.extend(pygame.event.get())
+        return events
+
     def run(self):
+        prof = self.profiler
         while self.running:
-            self.handle_events()
+            prof.begin_frame()
+            idle = self.redraw_on_demand and not self.needs_redraw and not prof.visible
+            events = self.wait_events() if idle else None
+            prof.mark('idle')
+            self.advance()
+            prof.mark('sim')
+            self.handle_events(events)
+            prof.mark('events')
             self.update()
+            prof.mark('update')
+
+            if self.state != self.drawn_state:
+                self.needs_redraw = True
+            if self.redraw_on_demand and not self.needs_redraw and not prof.visible:
+                prof.end_frame(self.state, 0)
+                continue
+            self.needs_redraw = False
+            self.drawn_state = self.state
 
             # draw current state
-            if self.state == 'menu':
-                self.draw_menu()
-            elif self.state == 'instructions':
-                self.draw_instructions()
-            elif self.state == 'level_select':
-                self.draw_level_select()
-            elif self.state == 'playing':
-                self.draw_playing()
-            elif self.state == 'pause':
-                self.draw_playing()
-                self.draw_pause()
-            elif self.state == 'timeup':
-                self.draw_playing()
-                self.draw_timeup()
-            elif self.state == 'level_complete':
-                self.draw_playing()
-                self.draw_level_complete()
-
-            pygame.display.flip()
-            self.clock.tick(FPS)
+            self.drawers[self.state]()
+            prof.mark('draw')
+
+            panel = prof.draw_overlay(self.screen, self.small_font)
+            if panel and self.state == 'playing':
+                # refreshed and erased like the other overlays on the maze layer
+                self.update_rects.append(panel)
+                self.overlay_rects.append(panel)
+            prof.mark('overlay')
 
+            if self.state == 'playing':
+                # only the overlays moved; push just those rects
+                pygame.display.update(self.update_rects)
+                rects = len(self.update_rects)
+            else:
+                pygame.display.flip()
+                # popups/menus painted over the maze, repaint it fully next time
+                self.full_redraw = True
+                rects = 1
+            prof.mark('present')
+            self.clock.tick(self.fps)
+            prof.mark('tick')
+            prof.end_frame(self.state, rects)
+
+        prof.close()
+        self.thumbs.close()
+        if self.recorder:
+            self.recorder.close()
+        self.cancel_huge()
+        self.huge_jobs.shutdown(wait=False, cancel_futures=True)
+        self.levels.close()
         pygame.quit()
         sys.exit()
 
 # ---------- run ----------
-if __name__ == '__main__':
-    game = MazeGame()
+def print_level_stats(workers=None):
+    # metrics are computed by the pack build (process pool) and stored in it
+    pack = maze_pack.open_pack() or maze_pack.LevelPack(maze_pack.build_pack(workers=workers))
+    print(f"{'difficulty':<10} {'level':>5} {'size':>7} {'path':>5} {'dead ends':>9} {'junctions':>9} "
+          f"{'corridor':>8} {'time':>5}")
+    for idx, difficulty in pack.keys():
+        m = pack.metrics(idx, difficulty)
+        lvl = MazeLevel(idx, difficulty, pack.grid(idx, difficulty), metrics=m)
+        print(f"{difficulty:<10} {idx + 1:>5} {f'{lvl.cols}x{lvl.rows}':>7} {m.path_length:>5} {m.dead_ends:>9} "
+              f"{m.junctions:>9} {m.mean_corridor:>8.2f} {level_time_limit(lvl, difficulty):>4}s")
+    pack.close()
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description=TITLE)
+    parser.add_argument('--build-pack', nargs='?', const=maze_pack.DEFAULT_PACK_PATH, metavar='PATH',
+                        help="write the level pack (default: %(const)s) and exit")
+    parser.add_argument('--levels', type=int, default=NUM_LEVELS,
+                        help=f"levels per difficulty in the pack, 1..{maze_pack.MAX_LEVELS} (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None,
+                        help="generator processes for --build-pack/--level-stats (default: all cores)")
+    parser.add_argument('--level-stats', action='store_true',
+                        help="print per-level maze metrics and time limits from the pack (built if needed) and exit")
+    parser.add_argument('--stream-maze', nargs=2, type=int, metavar=('COLS', 'ROWS'),
+                        help="stream one huge maze row by row into --out and exit")
+    parser.add_argument('--out', default='huge.mzpk', help="output for --stream-maze (default: %(default)s)")
+    parser.add_argument('--seed', type=int, default=None, help="seed for --stream-maze (default: random)")
+    parser.add_argument('--metrics', action='store_true',
+                        help="--stream-maze: store the maze's metrics too, so it loads without a pass over it "
+                             "(costs a byte per cell of memory)")
+    parser.add_argument('--huge-pack', metavar='PATH', help="play this streamed maze in Huge Maze mode")
+    parser.add_argument('--profile', action='store_true', help="start with the frame-time overlay (F3) shown")
+    parser.add_argument('--continuous', action='store_true',
+                        help="redraw every frame at FPS instead of only when something changed")
+    parser.add_argument('--fps', type=int, default=FPS,
+                        help="frame rate cap, 0 = uncapped; the simulation rate does not change (default: %(default)s)")
+    parser.add_argument('--vsync', action='store_true', help="present in step with the display's refresh instead")
+    parser.add_argument('--move-repeat', type=int, default=MOVE_REPEAT_MS, metavar='MS',
+                        help="step interval while a movement key is held, 0 = no repeat (default: %(default)s)")
+    parser.add_argument('--thumb-cache', default=maze_pack.DEFAULT_THUMB_PATH, metavar='PATH',
+                        help="keep level previews here between runs, '' = memory only (default: %(default)s)")
+    parser.add_argument('--record', metavar='DIR',
+                        help="record every level attempt's inputs as a replay file in DIR")
+    parser.add_argument('--replay', metavar='PATH',
+                        help="watch a recorded replay (verify headlessly with maze_replay.py)")
+    parser.add_argument('--trace', metavar='PATH',
+                        help="write per-frame phase timings to PATH (.jsonl for JSON lines, else CSV)")
+    args = parser.parse_args(argv)
+    if not 1 <= args.levels <= maze_pack.MAX_LEVELS:
+        parser.error(f"--levels must be between 1 and {maze_pack.MAX_LEVELS}")
+    if args.build_pack:
+        path = maze_pack.build_pack(args.build_pack, num_levels=args.levels, workers=args.workers)
+        print(f"wrote {path}")
+        return
+    if args.level_stats:
+        print_level_stats(args.workers)
+        return
+    if args.stream_maze:
+        cols, rows = args.stream_maze
+        seed = random.randrange(2**32) if args.seed is None else args.seed
+        rows_iter = eller_rows(cols, rows, random.Random(seed))
+        print(f"wrote {maze_pack.stream_level(args.out, cols, rows, rows_iter, seed=seed, metrics=args.metrics)}")
+        return
+    game = MazeGame(huge_pack=args.huge_pack, trace=args.trace, profile=args.profile,
+                    continuous=args.continuous, record=args.record, move_repeat_ms=args.move_repeat,
+                    fps=args.fps, vsync=args.vsync, thumb_cache=args.thumb_cache)
+    if args.replay:
+        game.start_replay(read_replay(args.replay))
     game.run()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,361 @@
+import random
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # binary tree / sidewinder fall back to plain Python, same output
+    np = None
+
+from maze_grid import MazeGrid, OPPOSITE
+
+# ---------- Level config (shared by the game, level packs and tools) ----------
+NUM_LEVELS = 50
+
+DIFFICULTIES = {
+    'Easy': {'scale': 1.0, 'time_mul': 1.2, 'hint': 3, 'algorithm': 'sidewinder'},
+    'Normal': {'scale': 1.2, 'time_mul': 1.0, 'hint': 2, 'algorithm': 'dfs'},
+    'Hard': {'scale': 1.5, 'time_mul': 0.8, 'hint': 1, 'algorithm': 'wilson'},
+}
+
+# ---------- Level layout ----------
+# bump whenever a change here alters generated layouts; stale level packs are rebuilt
+# 2: Easy levels use sidewinder and Hard levels wilson (was dfs), so every Easy and Hard layout changed
+GENERATOR_VERSION = 2
+
+def level_seed(level_idx):
+    return (level_idx+1) * 12345
+
+def generate_maze_cols_rows(level_idx, difficulty):
+    base = 15
+    add = level_idx // 5
+    scale = DIFFICULTIES[difficulty]['scale']
+    cols = int((base + add) * scale)
+    rows = int((base + add) * scale * 0.8)
+    cols = max(8, min(60, cols))
+    rows = max(6, min(48, rows))
+    return cols, rows
+
+def level_algorithm(difficulty):
+    return DIFFICULTIES[difficulty].get('algorithm', 'dfs')
+
+def generate_level_grid(level_idx, difficulty):
+    cols, rows = generate_maze_cols_rows(level_idx, difficulty)
+    return generate(level_algorithm(difficulty), cols, rows, random.Random(level_seed(level_idx)))
+
+# ---------- Generator registry ----------
+# every generator is generate(cols, rows, rng) -> MazeGrid and must yield a perfect maze.
+# ids are stored in level packs, so never renumber them.
+GENERATORS = {}
+GENERATOR_IDS = {}
+
+def register_generator(name, gen_id):
+    def deco(fn):
+        GENERATORS[name] = fn
+        GENERATOR_IDS[name] = gen_id
+        return fn
+    return deco
+
+def generate(name, cols, rows, rng):
+    try:
+        fn = GENERATORS[name]
+    except KeyError:
+        raise ValueError(f"unknown maze generator {name!r}; expected one of {sorted(GENERATORS)}") from None
+    return fn(cols, rows, rng)
+
+# direction tables (0=up, 1=right, 2=down, 3=left)
+CLEAR = (0b1110, 0b1101, 0b1011, 0b0111)  # cell mask with side d opened
+DIRS_OF_MASK = tuple(tuple(d for d in range(4) if (m >> d) & 1) for m in range(16))
+
+def _random_bits(rng, n):
+    # n coin flips as a bytes-like bit string; consumed identically with or without NumPy
+    return rng.getrandbits(n).to_bytes((n + 7) // 8, 'little') if n else b''
+
+def _random_u32(rng, n):
+    words = array('I')
+    words.frombytes(rng.randbytes(4 * n))
+    if sys.byteorder == 'big':
+        words.byteswap()
+    return words
+
+# Throughput in cells/second, CPython 3.11 on one core, 60x48 / 500x500:
+#   dfs          0.40M / 0.38M  (old list-of-lists backtracker: 0.22M / 0.19M)
+#   binary_tree  10.0M / 11.5M  with NumPy, 1.3-1.5M without
+#   sidewinder    5.2M /  5.2M  with NumPy, 1.2-1.8M without
+#   kruskal      0.26M / 0.17M
+#   wilson       0.12M / 0.07M
+
+# ---------- Recursive backtracker (DFS) ----------
+@register_generator('dfs', 0)
+def recursive_backtracker(cols, rows, rng):
+    # iterative, allocation-free: visited has a one-cell border so no bounds checks,
+    # the stack is preallocated, and choices index constant per-mask direction tuples
+    grid = MazeGrid(cols, rows)
+    cells = grid.cells
+    W = cols + 2
+    visited = bytearray(b'\x01') * (W * (rows + 2))
+    for r in range(1, rows + 1):
+        visited[r*W + 1:r*W + 1 + cols] = bytes(cols)
+    cstep = (-cols, 1, cols, -1)
+    vstep = (-W, 1, W, -1)
+    n = cols * rows
+    stack = array('i', [0]) * n   # cell index
+    vstack = array('i', [0]) * n  # same cell in the bordered visited grid
+    choice = rng.choice
+    top = 0
+    vstack[0] = W + 1
+    visited[W + 1] = 1
+    while top >= 0:
+        v = vstack[top]
+        mask = ((visited[v-W] ^ 1) | (visited[v+1] ^ 1) << 1
+                | (visited[v+W] ^ 1) << 2 | (visited[v-1] ^ 1) << 3)
+        if mask:
+            d = choice(DIRS_OF_MASK[mask])
+            i = stack[top]
+            j = i + cstep[d]
+            cells[i] &= CLEAR[d]
+            cells[j] &= CLEAR[OPPOSITE[d]]
+            v += vstep[d]
+            visited[v] = 1
+            top += 1
+            stack[top] = j
+            vstack[top] = v
+        else:
+            top -= 1
+    return grid
+
+def dfs_maze(cols, rows, seed=None):
+    # private RNG: safe on worker threads and leaves the global one alone
+    return recursive_backtracker(cols, rows, random.Random(seed))
+
+# ---------- Binary tree ----------
+@register_generator('binary_tree', 1)
+def binary_tree(cols, rows, rng):
+    # each cell opens up or right; the top row can only go right, the last column only up
+    n = cols * rows
+    bits = _random_bits(rng, n)
+    if np is not None:
+        up = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), bitorder='little')[:n].reshape(rows, cols).astype(bool)
+        last_col = np.zeros((rows, cols), dtype=bool)
+        last_col[:, -1] = True
+        up = (up | last_col)
+        up[0, :] = False
+        right = ~up
+        right[:, -1] = False
+        m = np.full((rows, cols), 0b1111, dtype=np.uint8)
+        m[up] &= CLEAR[0]
+        m[:-1][up[1:]] &= CLEAR[2]
+        m[right] &= CLEAR[1]
+        m[:, 1:][right[:, :-1]] &= CLEAR[3]
+        return MazeGrid(cols, rows, array('B', m.tobytes()))
+    grid = MazeGrid(cols, rows)
+    cells = grid.cells
+    for r in range(rows):
+        for c in range(cols):
+            i = r*cols + c
+            if r > 0 and (c == cols - 1 or (bits[i >> 3] >> (i & 7)) & 1):
+                cells[i] &= CLEAR[0]
+                cells[i - cols] &= CLEAR[2]
+            elif c < cols - 1:
+                cells[i] &= CLEAR[1]
+                cells[i + 1] &= CLEAR[3]
+    return grid
+
+# ---------- Sidewinder ----------
+@register_generator('sidewinder', 2)
+def sidewinder(cols, rows, rng):
+    # top row is one corridor; below it each run of cells going right is closed by a
+    # coin flip (or the east wall) and opens up from one random cell of the run
+    n = cols * rows
+    bits = _random_bits(rng, n)
+    picks = _random_u32(rng, n)
+    if np is not None:
+        col = np.arange(cols)
+        close = np.unpackbits(np.frombuffer(bits, dtype=np.uint8), bitorder='little')[:n].reshape(rows, cols).astype(bool)
+        close[:, -1] = True
+        close[0, :] = False
+        right = ~close
+        right[:, -1] = False
+        starts = np.zeros((rows, cols), dtype=bool)
+        starts[:, 0] = True
+        starts[:, 1:] = close[:, :-1]
+        run_start = np.maximum.accumulate(np.where(starts, col, 0), axis=1)
+        rr, cc = np.nonzero(close)
+        s = run_start[rr, cc]
+        pick = np.frombuffer(picks, dtype=np.uint32).reshape(rows, cols)[rr, cc]
+        chosen = s + (pick % (cc - s + 1))
+        up = np.zeros((rows, cols), dtype=bool)
+        up[rr, chosen] = True
+        m = np.full((rows, cols), 0b1111, dtype=np.uint8)
+        m[up] &= CLEAR[0]
+        m[:-1][up[1:]] &= CLEAR[2]
+        m[right] &= CLEAR[1]
+        m[:, 1:][right[:, :-1]] &= CLEAR[3]
+        return MazeGrid(cols, rows, array('B', m.tobytes()))
+    grid = MazeGrid(cols, rows)
+    cells = grid.cells
+    for c in range(cols - 1):
+        cells[c] &= CLEAR[1]
+        cells[c + 1] &= CLEAR[3]
+    for r in range(1, rows):
+        base = r * cols
+        start = 0
+        for c in range(cols):
+            i = base + c
+            if c == cols - 1 or (bits[i >> 3] >> (i & 7)) & 1:
+                j = base + start + picks[i] % (c - start + 1)
+                cells[j] &= CLEAR[0]
+                cells[j - cols] &= CLEAR[2]
+                start = c + 1
+            else:
+                cells[i] &= CLEAR[1]
+                cells[i + 1] &= CLEAR[3]
+    return grid
+
+# ---------- Kruskal (randomised edges + union-find) ----------
+@register_generator('kruskal', 3)
+def kruskal(cols, rows, rng):
+    grid = MazeGrid(cols, rows)
+    cells = grid.cells
+    n = cols * rows
+    # edge e: cell e>>1, side right (e even) or down (e odd)
+    edges = [e for i in range(n) for e in (2*i, 2*i + 1)
+             if (e & 1 and i + cols < n) or (not e & 1 and i % cols != cols - 1)]
+    rng.shuffle(edges)
+    parent = array('i', range(n))
+    joined = 0
+    for e in edges:
+        i = e >> 1
+        j = i + cols if e & 1 else i + 1
+        a = i
+        while parent[a] != a:
+            parent[a] = parent[parent[a]]
+            a = parent[a]
+        b = j
+        while parent[b] != b:
+            parent[b] = parent[parent[b]]
+            b = parent[b]
+        if a == b:
+            continue
+        parent[a] = b
+        if e & 1:
+            cells[i] &= CLEAR[2]
+            cells[j] &= CLEAR[0]
+        else:
+            cells[i] &= CLEAR[1]
+            cells[j] &= CLEAR[3]
+        joined += 1
+        if joined == n - 1:
+            break
+    return grid
+
+# ---------- Wilson (loop-erased random walks, uniform spanning tree) ----------
+@register_generator('wilson', 4)
+def wilson(cols, rows, rng):
+    grid = MazeGrid(cols, rows)
+    cells = grid.cells
+    n = cols * rows
+    # usable directions per cell so a walk never steps off the grid
+    valid = [DIRS_OF_MASK[(r > 0) | (c < cols-1) << 1 | (r < rows-1) << 2 | (c > 0) << 3]
+             for r in range(rows) for c in range(cols)]
+    step = (-cols, 1, cols, -1)
+    in_tree = bytearray(n)
+    in_tree[rng.randrange(n)] = 1
+    heading = bytearray(n)  # last direction taken out of each cell on the current walk
+    choice = rng.choice
+    remaining = n - 1
+    for start in range(n):
+        if in_tree[start]:
+            continue
+        # random walk until it hits the tree; overwriting heading erases loops
+        i = start
+        while not in_tree[i]:
+            d = choice(valid[i])
+            heading[i] = d
+            i += step[d]
+        # carve the loop-erased path
+        i = start
+        while not in_tree[i]:
+            d = heading[i]
+            j = i + step[d]
+            cells[i] &= CLEAR[d]
+            cells[j] &= CLEAR[OPPOSITE[d]]
+            in_tree[i] = 1
+            i = j
+            remaining -= 1
+        if not remaining:
+            break
+    return grid
+
+# ---------- Eller (streaming, one row at a time) ----------
+def eller_rows(cols, rows, rng):
+    # yields each row's wall masks (a bytearray of cols) as soon as the row is final.
+    # Only O(cols) state survives between rows, so huge mazes can be streamed to disk.
+    identity = array('i', range(cols))
+    label = array('i', range(cols))   # set of each cell in the current row, < cols
+    parent = array('i', identity)     # union-find over labels, reset every row
+    last = array('i', identity)       # rightmost column of each set in the row
+    used = bytearray(cols)
+    has_down = bytearray(cols)
+    row = bytearray(b'\x0f') * cols
+    for r in range(rows):
+        final = r == rows - 1
+        # cells not joined from above get fresh labels
+        used[:] = bytes(cols)
+        for c in range(cols):
+            if label[c] >= 0:
+                used[label[c]] = 1
+        free = 0
+        for c in range(cols):
+            if label[c] < 0:
+                while used[free]:
+                    free += 1
+                used[free] = 1
+                label[c] = free
+        parent[:] = identity
+        # join neighbours in different sets: at random, or always on the last row
+        joins = _random_bits(rng, cols)
+        for c in range(cols - 1):
+            a = label[c]
+            while parent[a] != a:
+                parent[a] = parent[parent[a]]
+                a = parent[a]
+            b = label[c + 1]
+            while parent[b] != b:
+                parent[b] = parent[parent[b]]
+                b = parent[b]
+            if a != b and (final or (joins[c >> 3] >> (c & 7)) & 1):
+                parent[b] = a
+                row[c] &= CLEAR[1]
+                row[c + 1] &= CLEAR[3]
+        for c in range(cols):
+            a = label[c]
+            while parent[a] != a:
+                a = parent[a]
+            label[c] = a
+        if final:
+            yield row
+            return
+        # every set drops at least one cell into the next row
+        nxt = bytearray(b'\x0f') * cols
+        downs = _random_bits(rng, cols)
+        for c in range(cols):
+            last[label[c]] = c
+        has_down[:] = bytes(cols)
+        for c in range(cols):
+            s = label[c]
+            if (downs[c >> 3] >> (c & 7)) & 1 or (last[s] == c and not has_down[s]):
+                has_down[s] = 1
+                row[c] &= CLEAR[2]
+                nxt[c] &= CLEAR[0]
+            else:
+                label[c] = -1
+        yield row
+        row = nxt
+
+@register_generator('eller', 5)
+def eller(cols, rows, rng):
+    cells = array('B')
+    for row in eller_rows(cols, rows, rng):
+        cells.frombytes(row)
+    return MazeGrid(cols, rows, cells)
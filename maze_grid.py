@@ -0,0 +1,109 @@
+from array import array
+
+# ---------- Directions ----------
+# d: 0=up, 1=right, 2=down, 3=left (same order as the old walls[r][c] lists)
+DR = (-1, 0, 1, 0)
+DC = (0, 1, 0, -1)
+OPPOSITE = (2, 3, 0, 1)
+DIR_OF_DELTA = {(-1,0):0, (0,1):1, (1,0):2, (0,-1):3}
+
+ALL_WALLS = 0b1111
+
+# open directions for every 4-bit wall mask, so neighbour loops never allocate
+OPEN_DIRS = tuple(tuple(d for d in range(4) if not (mask >> d) & 1) for mask in range(16))
+
+# ---------- Maze grid (one uint8 per cell, bit d set = wall on side d) ----------
+class MazeGrid:
+    __slots__ = ('cols', 'rows', 'cells')
+
+    def __init__(self, cols, rows, cells=None):
+        self.cols = cols
+        self.rows = rows
+        # any byte buffer works here: array('B'), bytearray, or a memoryview into a file
+        if cells is None:
+            cells = array('B', [ALL_WALLS]) * (cols * rows)
+        elif len(cells) != cols * rows:
+            raise ValueError(f"expected {cols*rows} cells, got {len(cells)}")
+        self.cells = cells
+
+    def neighbors(self, r, c):
+        for d in OPEN_DIRS[self.cells[r * self.cols + c]]:
+            yield r + DR[d], c + DC[d]
+
+    def carve(self, r, c, d):
+        # remove the wall on side d of (r,c) and the matching wall of the neighbour
+        cols = self.cols
+        cells = self.cells
+        cells[r * cols + c] &= ~(1 << d)
+        cells[(r + DR[d]) * cols + c + DC[d]] &= ~(1 << OPPOSITE[d])
+
+    def __eq__(self, other):
+        if not isinstance(other, MazeGrid):
+            return NotImplemented
+        return (self.cols, self.rows) == (other.cols, other.rows) and bytes(self.cells) == bytes(other.cells)
+
+    def __repr__(self):
+        return f"MazeGrid({self.cols}x{self.rows})"
+
+# ---------- Wall geometry ----------
+def wall_segments(grid, r0=0, c0=0, nrows=None, ncols=None):
+    # maximal straight wall runs in grid-corner units: (x0, y0, x1, y1), each
+    # shared wall emitted once; scale by cell size to draw at any resolution.
+    # r0/c0/nrows/ncols restrict the pass to a window of cells (viewport culling).
+    cols, rows, cells = grid.cols, grid.rows, grid.cells
+    r1 = rows if nrows is None else min(rows, r0 + nrows)
+    c1 = cols if ncols is None else min(cols, c0 + ncols)
+    segs = []
+    # horizontal lines: top walls of row y, bottom walls of the last row
+    for y in range(r0, r1 + 1):
+        r, bit = (y, 1) if y < rows else (rows - 1, 4)
+        base = r * cols
+        run = -1
+        for c in range(c0, c1):
+            if cells[base + c] & bit:
+                if run < 0: run = c
+            elif run >= 0:
+                segs.append((run, y, c, y))
+                run = -1
+        if run >= 0:
+            segs.append((run, y, c1, y))
+    # vertical lines: left walls of column x, right walls of the last column
+    for x in range(c0, c1 + 1):
+        c, bit = (x, 8) if x < cols else (cols - 1, 2)
+        run = -1
+        for r in range(r0, r1):
+            if cells[r * cols + c] & bit:
+                if run < 0: run = r
+            elif run >= 0:
+                segs.append((x, run, x, r))
+                run = -1
+        if run >= 0:
+            segs.append((x, run, x, r1))
+    return segs
+
+def wall_raster(grid, width=None, height=None):
+    # one byte per pixel (1 = wall) of the maze as a (2*cols+1) x (2*rows+1) bitmap: cells on
+    # odd/odd pixels, the walls between them, corners on even/even. A smaller size samples that
+    # bitmap (nearest pixel), so the cost is width*height however big the maze is.
+    cols, rows, cells = grid.cols, grid.rows, grid.cells
+    bw, bh = 2*cols + 1, 2*rows + 1
+    width = width or bw
+    height = height or bh
+    # end to end, so the outer walls always land on the border pixels
+    xs = [x * (bw - 1) // max(1, width - 1) for x in range(width)]
+    # per column: (cell offset, bit) of the vertical wall it shows on cell rows, None inside a cell
+    vert = [None if bx & 1 else ((bx >> 1, 3) if bx >> 1 < cols else (cols - 1, 1)) for bx in xs]
+    # per column: cell offset of the horizontal wall it shows on wall rows, None on a corner
+    horz = [bx >> 1 if bx & 1 else None for bx in xs]
+    out = bytearray(width * height)
+    for y in range(height):
+        by = y * (bh - 1) // max(1, height - 1)
+        if by & 1:
+            base = (by >> 1) * cols
+            row = [0 if v is None else cells[base + v[0]] >> v[1] & 1 for v in vert]
+        else:
+            line = by >> 1
+            base, bit = (line * cols, 1) if line < rows else ((rows - 1) * cols, 4)
+            row = [1 if c is None else (cells[base + c] & bit) != 0 for c in horz]
+        out[y*width:(y + 1)*width] = bytes(row)
+    return bytes(out)
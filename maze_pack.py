@@ -0,0 +1,237 @@
+import mmap
+import os
+import struct
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+
+from maze_grid import MazeGrid
+from maze_solver import LevelMetrics, TreeField, level_metrics
+from maze_gen import (NUM_LEVELS, DIFFICULTIES, GENERATOR_VERSION, GENERATOR_IDS, generate_maze_cols_rows,
+                      generate_level_grid, level_algorithm, level_seed)
+
+# ---------- Level pack format ----------
+# header: magic, format version, generator version, entry count
+# entry:  level idx, difficulty id, generator id (maze_gen.GENERATOR_IDS), cols, rows, seed,
+#         generator version, data offset, then maze_solver.LevelMetrics (path length -1 = not computed)
+# data:   cols*rows wall bytes per level (MazeGrid layout), so levels map straight onto the file
+PACK_MAGIC = b'MZPK'
+PACK_FORMAT = 2
+HEADER = struct.Struct('<4sHHII')
+ENTRY = struct.Struct('<HBBIIQIQiIIf')
+NO_METRICS = LevelMetrics(-1, 0, 0, 0.0)  # not computed: the game does it on load
+MAX_LEVELS = 0x10000  # per difficulty: ENTRY stores the level idx as a u16
+
+DEFAULT_PACK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'levels.mzpk')
+
+# ---------- Thumbnail cache format ----------
+# header: as the pack's, with its own magic; a generator version change drops every entry
+# entry:  level idx, difficulty id, width, height, then width*height pixels (maze_grid.wall_raster)
+THUMB_MAGIC = b'MZTH'
+THUMB_FORMAT = 1
+THUMB_ENTRY = struct.Struct('<HBHH')
+DEFAULT_THUMB_PATH = DEFAULT_PACK_PATH + '.thumbs'
+
+DIFFICULTY_IDS = {name: i for i, name in enumerate(DIFFICULTIES)}
+DIFFICULTY_NAMES = list(DIFFICULTIES)
+
+def expected_entries(num_levels=NUM_LEVELS):
+    # every (idx, difficulty) the game can ask for, with the layout parameters it expects
+    for difficulty in DIFFICULTIES:
+        for idx in range(num_levels):
+            cols, rows = generate_maze_cols_rows(idx, difficulty)
+            yield idx, difficulty, cols, rows, level_seed(idx), level_algorithm(difficulty)
+
+def generate_level(idx, difficulty):
+    # runs in the build workers, so the per-level analytics come for free with the pack
+    grid = generate_level_grid(idx, difficulty)
+    return idx, difficulty, level_seed(idx), level_algorithm(difficulty), grid, level_metrics(grid)
+
+# ---------- Writing ----------
+def write_pack(path, levels):
+    # levels: iterable of (idx, difficulty, seed, algorithm, MazeGrid, LevelMetrics); written to a
+    # temp file then swapped in
+    levels = list(levels)
+    offset = HEADER.size + ENTRY.size * len(levels)
+    index = []
+    for idx, difficulty, seed, algorithm, grid, metrics in levels:
+        if not 0 <= idx < MAX_LEVELS:
+            raise ValueError(f"level idx {idx} does not fit the pack (0..{MAX_LEVELS - 1})")
+        index.append(ENTRY.pack(idx, DIFFICULTY_IDS[difficulty], GENERATOR_IDS[algorithm], grid.cols, grid.rows,
+                                seed, GENERATOR_VERSION, offset, *metrics))
+        offset += grid.cols * grid.rows
+    with _atomic_write(path) as f:
+        f.write(HEADER.pack(PACK_MAGIC, PACK_FORMAT, 0, GENERATOR_VERSION, len(levels)))
+        f.writelines(index)
+        for *_, grid, _metrics in levels:
+            f.write(grid.cells)
+    return path
+
+def stream_level(path, cols, rows, row_iter, seed=0, algorithm='eller', idx=0, difficulty='Normal', metrics=False):
+    # single-level pack written row by row as row_iter yields (e.g. maze_gen.eller_rows),
+    # so the maze never has to exist in memory; read it back lazily with LevelPack.
+    # metrics: also measure the finished file, so loading it never has to walk the maze.
+    # That pass costs a byte per cell (about 100 MB at 10k x 10k), the rows alone O(cols).
+    offset = HEADER.size + ENTRY.size
+    entry = (idx, DIFFICULTY_IDS[difficulty], GENERATOR_IDS[algorithm], cols, rows, seed, GENERATOR_VERSION, offset)
+    with _atomic_write(path) as f:
+        f.write(HEADER.pack(PACK_MAGIC, PACK_FORMAT, 0, GENERATOR_VERSION, 1))
+        f.write(ENTRY.pack(*entry, *NO_METRICS))
+        written = 0
+        for row in row_iter:
+            if len(row) != cols:
+                raise ValueError(f"row {written} has {len(row)} cells, expected {cols}")
+            f.write(row)
+            written += 1
+        if written != rows:
+            raise ValueError(f"generator produced {written} rows, expected {rows}")
+        if metrics:
+            f.flush()
+            f.seek(HEADER.size)
+            f.write(ENTRY.pack(*entry, *_mapped_metrics(f, cols, rows, offset)))
+    return path
+
+def _mapped_metrics(f, cols, rows, offset):
+    # LevelMetrics of the level at offset in the open file f, read through mmap with a TreeField:
+    # about one byte per cell of memory however big the level. NO_METRICS if it has loops.
+    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        with memoryview(mm) as view, view[offset:offset + cols*rows] as cells:
+            grid = MazeGrid(cols, rows, cells)
+            goal = (rows - 1, cols - 1)
+            field = TreeField.build(grid, goal)
+            result = level_metrics(grid, (0, 0), goal, field) if field else NO_METRICS
+            del grid
+    return result
+
+def write_thumbs(path, rasters):
+    # rasters: {(idx, difficulty): (width, height, pixels)}
+    with _atomic_write(path) as f:
+        f.write(HEADER.pack(THUMB_MAGIC, THUMB_FORMAT, 0, GENERATOR_VERSION, len(rasters)))
+        for (idx, difficulty), (w, h, pixels) in rasters.items():
+            f.write(THUMB_ENTRY.pack(idx, DIFFICULTY_IDS[difficulty], w, h))
+            f.write(pixels)
+    return path
+
+def read_thumbs(path):
+    # {} for a missing, damaged or outdated file: thumbnails are cheap to make again
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        magic, fmt, _, version, count = HEADER.unpack_from(data, 0)
+        if magic != THUMB_MAGIC or fmt != THUMB_FORMAT or version != GENERATOR_VERSION:
+            return {}
+        rasters = {}
+        pos = HEADER.size
+        for _ in range(count):
+            idx, diff_id, w, h = THUMB_ENTRY.unpack_from(data, pos)
+            pos += THUMB_ENTRY.size
+            if pos + w*h > len(data):
+                return {}
+            rasters[(idx, DIFFICULTY_NAMES[diff_id])] = (w, h, data[pos:pos + w*h])
+            pos += w*h
+        return rasters
+    except (OSError, struct.error, IndexError):
+        return {}
+
+@contextmanager
+def _atomic_write(path):
+    # write to a temp file and swap it in, so readers never see a half-written pack
+    tmp = f"{path}.tmp{os.getpid()}"
+    try:
+        with open(tmp, 'w+b') as f:
+            yield f
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+def generate_levels(keys, workers=1):
+    # keys: (idx, difficulty) pairs. Every level seeds its own RNG and results come
+    # back in key order, so the output is identical for any worker count.
+    keys = list(keys)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(keys) < 2:
+        return [generate_level(idx, difficulty) for idx, difficulty in keys]
+    chunk = max(1, len(keys) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        return list(ex.map(generate_level, *zip(*keys), chunksize=chunk))
+
+def build_pack(path=DEFAULT_PACK_PATH, num_levels=NUM_LEVELS, workers=1):
+    if not 1 <= num_levels <= MAX_LEVELS:
+        raise ValueError(f"num_levels must be 1..{MAX_LEVELS}, got {num_levels}")
+    keys = [(idx, difficulty) for idx, difficulty, *_ in expected_entries(num_levels)]
+    return write_pack(path, generate_levels(keys, workers))
+
+# ---------- Reading (memory-mapped) ----------
+class LevelPack:
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._mm)
+        if len(self._mm) < HEADER.size:
+            raise ValueError(f"{path}: truncated level pack")
+        magic, fmt, _, self.generator_version, count = HEADER.unpack_from(self._mm, 0)
+        if magic != PACK_MAGIC or fmt != PACK_FORMAT:
+            raise ValueError(f"{path}: not a level pack (format {fmt})")
+        self.entries = {}  # (idx, difficulty) -> (cols, rows, seed, algorithm id, version, offset)
+        self._metrics = {}  # (idx, difficulty) -> LevelMetrics
+        for i in range(count):
+            idx, diff_id, algo, cols, rows, seed, version, offset, *metrics = ENTRY.unpack_from(
+                self._mm, HEADER.size + i*ENTRY.size)
+            if offset + cols*rows > len(self._mm):
+                raise ValueError(f"{path}: level {idx} runs past end of file")
+            if diff_id < len(DIFFICULTY_NAMES):
+                key = (idx, DIFFICULTY_NAMES[diff_id])
+                self.entries[key] = (cols, rows, seed, algo, version, offset)
+                self._metrics[key] = LevelMetrics(*metrics)
+
+    def is_current(self):
+        # stale if the generator changed or any level's size/seed no longer matches
+        if self.generator_version != GENERATOR_VERSION:
+            return False
+        for idx, difficulty, cols, rows, seed, algorithm in expected_entries():
+            entry = self.entries.get((idx, difficulty))
+            if entry is None or entry[:5] != (cols, rows, seed, GENERATOR_IDS[algorithm], GENERATOR_VERSION):
+                return False
+        return True
+
+    def keys(self):
+        return list(self.entries)
+
+    def seed(self, idx, difficulty):
+        return self.entries[(idx, difficulty)][2]
+
+    def metrics(self, idx, difficulty):
+        # None if the level is not in the pack or was stored without them
+        metrics = self._metrics.get((idx, difficulty))
+        return metrics if metrics and metrics.path_length >= 0 else None
+
+    def grid(self, idx, difficulty):
+        # zero-copy: the grid's cells are a read-only view into the mapped file
+        entry = self.entries.get((idx, difficulty))
+        if entry is None:
+            return None
+        cols, rows, *_, offset = entry
+        return MazeGrid(cols, rows, self._view[offset:offset + cols*rows])
+
+    def close(self):
+        self._view.release()
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # grids handed out still reference the mapping
+
+def open_pack(path=DEFAULT_PACK_PATH):
+    # None when the pack is missing, unreadable or built by another generator version
+    if not os.path.isfile(path):
+        return None
+    try:
+        pack = LevelPack(path)
+    except (OSError, ValueError):
+        return None
+    if not pack.is_current():
+        pack.close()
+        return None
+    return pack
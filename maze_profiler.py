@@ -0,0 +1,160 @@
+import csv
+import json
+import time
+from collections import deque
+
+import pygame
+
+# ---------- Config ----------
+PHASES = ('idle', 'sim', 'events', 'update', 'draw', 'overlay', 'present', 'tick')
+HISTORY = 240          # frames kept for the rolling stats / sparkline
+BUDGET_MS = 1000 / 60  # reference line on the sparkline
+
+# pygame.draw primitives counted as "draw calls" while profiling
+COUNTED_DRAW = ('line', 'lines', 'aaline', 'aalines', 'rect', 'circle', 'ellipse', 'polygon', 'arc')
+
+OVERLAY_BG = (0, 0, 0, 190)
+OVERLAY_W = 280
+SPARK_H = 40
+
+# ---------- Frame profiler ----------
+class FrameProfiler:
+    # run() calls begin_frame / mark(phase) / end_frame every frame. While neither the
+    # overlay nor a trace is on, those are a single attribute test each.
+    def __init__(self, trace_path=None):
+        self.visible = False
+        self.history = {p: deque(maxlen=HISTORY) for p in PHASES}
+        self.frame_ms = deque(maxlen=HISTORY)
+        self.draw_calls = 0
+        self.last_draw_calls = 0
+        self.last_rects = 0
+        self.frame_no = 0
+        self._active = False
+        self._t0 = 0.0
+        self._last = 0.0
+        self._cur = {}
+        self._orig_draw = None
+        self._trace = None
+        self._writer = None
+        if trace_path:
+            self.open_trace(trace_path)
+
+    # ---- switching ----
+    def toggle(self):
+        self.visible = not self.visible
+        self._sync()
+
+    def open_trace(self, path):
+        # buffered; .jsonl gets one JSON object per frame, anything else CSV
+        self._trace = open(path, 'w', newline='', buffering=1 << 16)
+        if path.endswith('.jsonl'):
+            self._writer = None
+        else:
+            self._writer = csv.writer(self._trace)
+            self._writer.writerow(['frame', 'time_s', 'state'] + [f"{p}_ms" for p in PHASES]
+                                  + ['total_ms', 'draw_calls', 'dirty_rects'])
+        self._sync()
+
+    def close(self):
+        if self._trace:
+            self._trace.close()
+            self._trace = None
+        self.visible = False
+        self._sync()
+
+    def _sync(self):
+        self._active = self.visible or self._trace is not None
+        if self._active and self._orig_draw is None:
+            self._orig_draw = {name: getattr(pygame.draw, name) for name in COUNTED_DRAW}
+            for name, fn in self._orig_draw.items():
+                setattr(pygame.draw, name, self._counting(fn))
+        elif not self._active and self._orig_draw is not None:
+            for name, fn in self._orig_draw.items():
+                setattr(pygame.draw, name, fn)
+            self._orig_draw = None
+
+    def _counting(self, fn):
+        def wrapper(*args, **kwargs):
+            self.draw_calls += 1
+            return fn(*args, **kwargs)
+        return wrapper
+
+    # ---- per-frame hooks ----
+    def begin_frame(self):
+        if not self._active:
+            return
+        self._t0 = self._last = time.perf_counter()
+        self._cur = {}
+        self.draw_calls = 0
+
+    def mark(self, phase):
+        # time since the previous mark is charged to phase
+        if not self._active:
+            return
+        now = time.perf_counter()
+        self._cur[phase] = (now - self._last) * 1e3
+        self._last = now
+        if phase == 'draw':
+            self.last_draw_calls = self.draw_calls
+
+    def end_frame(self, state, dirty_rects=0):
+        if not self._active:
+            return
+        total = (time.perf_counter() - self._t0) * 1e3
+        cur = self._cur
+        for p in PHASES:
+            self.history[p].append(cur.get(p, 0.0))
+        self.frame_ms.append(total)
+        self.last_rects = dirty_rects
+        self.frame_no += 1
+        if self._trace:
+            row = [cur.get(p, 0.0) for p in PHASES]
+            if self._writer is None:
+                rec = {'frame': self.frame_no, 'time_s': self._t0, 'state': state,
+                       'total_ms': total, 'draw_calls': self.last_draw_calls, 'dirty_rects': dirty_rects}
+                rec.update({f"{p}_ms": v for p, v in zip(PHASES, row)})
+                self._trace.write(json.dumps(rec) + '\n')
+            else:
+                self._writer.writerow([self.frame_no, f"{self._t0:.6f}", state]
+                                      + [f"{v:.3f}" for v in row]
+                                      + [f"{total:.3f}", self.last_draw_calls, dirty_rects])
+
+    # ---- stats / overlay ----
+    def percentile(self, q):
+        if not self.frame_ms:
+            return 0.0
+        s = sorted(self.frame_ms)
+        return s[min(len(s) - 1, int(len(s) * q))]
+
+    def draw_overlay(self, surf, font):
+        # top-right panel; returns its rect so dirty-rect frames can update/erase it
+        if not self.visible:
+            return None
+        lines = [
+            f"frame p50 {self.percentile(0.5):5.2f} ms  p99 {self.percentile(0.99):5.2f} ms",
+            f"draw calls {self.last_draw_calls}  dirty rects {self.last_rects}",
+        ]
+        for p in PHASES:
+            h = self.history[p]
+            avg = sum(h) / len(h) if h else 0.0
+            lines.append(f"{p:<8} {avg:6.2f} ms")
+        line_h = font.get_linesize()
+        h = 8 + line_h * len(lines) + SPARK_H + 8
+        rect = pygame.Rect(surf.get_width() - OVERLAY_W - 8, 8, OVERLAY_W, h)
+        panel = pygame.Surface(rect.size, pygame.SRCALPHA)
+        panel.fill(OVERLAY_BG)
+        y = 4
+        for text in lines:
+            panel.blit(font.render(text, True, (230, 230, 230)), (6, y))
+            y += line_h
+        # sparkline of frame times; the yellow line is the 60 FPS budget
+        top = y + 4
+        scale = SPARK_H / max(BUDGET_MS * 2, max(self.frame_ms, default=0.0))
+        pygame.draw.line(panel, (220, 200, 60), (6, top + SPARK_H - BUDGET_MS * scale),
+                         (OVERLAY_W - 6, top + SPARK_H - BUDGET_MS * scale))
+        if len(self.frame_ms) > 1:
+            step = (OVERLAY_W - 12) / (HISTORY - 1)
+            pts = [(6 + i * step, top + SPARK_H - v * scale) for i, v in enumerate(self.frame_ms)]
+            pygame.draw.lines(panel, (80, 220, 120), False, pts)
+        surf.blit(panel, rect)
+        return rect
@@ -0,0 +1,209 @@
+import argparse
+import os
+import queue
+import struct
+import threading
+import time
+
+import maze_pack
+from maze_gen import GENERATOR_VERSION, level_seed
+from maze_core import (GameCore, MazeLevel, LevelProvider, HUGE_LEVEL_IDX, INPUT_HINT, INPUT_PAUSE, INPUT_RESUME,
+                       huge_grid)
+
+# ---------- Replay format ----------
+# header: magic, format version, generator version, level idx (-1 = huge), difficulty id,
+#         seed, cols, rows
+# body:   one LEB128 varint per input: (ms since the previous input) << 3 | code
+# Most inputs fit in 2 bytes; only the level is stored, never the maze.
+REPLAY_MAGIC = b'MZRP'
+# format 2: pause/resume are recorded as inputs and the clock stops in between; format 1
+# replays time moves across a pause differently and are not replayed
+REPLAY_FORMAT = 2
+HEADER = struct.Struct('<4sHHhBQII')
+
+# input codes (maze_core.INPUT_*): 0-3 moves in maze_grid direction order, then hint,
+# pause, resume and end (level finished or time ran out; the replay works out which)
+CODE_BITS = 3
+CODE_MASK = (1 << CODE_BITS) - 1
+
+FLUSH_BYTES = 4096
+
+# ---------- Recording ----------
+class InputRecorder:
+    # set as GameCore.recorder: one .mzrp file per level attempt under directory.
+    # Inputs are encoded into a bytearray and handed to a writer thread in chunks,
+    # so the render loop never touches the file.
+    def __init__(self, directory, flush_bytes=FLUSH_BYTES):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.flush_bytes = flush_bytes
+        self.path = None
+        self._buf = bytearray()
+        self._last_ms = 0
+        self._count = 0
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._writer, name='replay-writer', daemon=True)
+        self._thread.start()
+
+    def begin(self, level, difficulty, now_ms):
+        self.end()
+        self._count += 1
+        name = 'huge' if level.idx == HUGE_LEVEL_IDX else f"L{level.idx + 1}"
+        self.path = os.path.join(self.directory,
+                                 f"{time.strftime('%Y%m%d-%H%M%S')}-{self._count:03d}-{name}-{difficulty}.mzrp")
+        self._queue.put(('open', self.path))
+        self._buf += HEADER.pack(REPLAY_MAGIC, REPLAY_FORMAT, GENERATOR_VERSION, level.idx,
+                                 maze_pack.DIFFICULTY_IDS[difficulty], level.seed, level.cols, level.rows)
+        self._last_ms = now_ms
+
+    def log(self, code, now_ms):
+        v = max(0, now_ms - self._last_ms) << CODE_BITS | code
+        self._last_ms = now_ms
+        buf = self._buf
+        while v > 0x7f:
+            buf.append(v & 0x7f | 0x80)
+            v >>= 7
+        buf.append(v)
+        if len(buf) >= self.flush_bytes:
+            self.flush()
+
+    def flush(self):
+        if self._buf:
+            self._queue.put(('write', bytes(self._buf)))
+            self._buf.clear()
+
+    def end(self):
+        if self.path is None:
+            return
+        self.flush()
+        self._queue.put(('close', None))
+        self.path = None
+
+    def close(self):
+        # finish the current file and wait for the writer to drain
+        self.end()
+        self._queue.put(None)
+        self._thread.join()
+
+    def _writer(self):
+        f = None
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            op, arg = item
+            if op == 'open':
+                f = open(arg, 'wb')
+            elif op == 'write':
+                f.write(arg)
+            elif f is not None:
+                f.close()
+                f = None
+
+# ---------- Reading ----------
+class Replay:
+    __slots__ = ('idx', 'difficulty', 'seed', 'cols', 'rows', 'generator_version', 'events')
+
+    def __init__(self, idx, difficulty, seed, cols, rows, generator_version, events):
+        self.idx = idx
+        self.difficulty = difficulty
+        self.seed = seed
+        self.cols = cols
+        self.rows = rows
+        self.generator_version = generator_version
+        self.events = events  # [(ms since level start, code)]
+
+    def duration_ms(self):
+        return self.events[-1][0] if self.events else 0
+
+def read_replay(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    if len(data) < HEADER.size:
+        raise ValueError(f"{path}: truncated replay")
+    magic, fmt, version, idx, diff_id, seed, cols, rows = HEADER.unpack_from(data, 0)
+    if magic != REPLAY_MAGIC:
+        raise ValueError(f"{path}: not a replay")
+    if fmt != REPLAY_FORMAT:
+        raise ValueError(f"{path}: replay format {fmt}, this build reads format {REPLAY_FORMAT}")
+    events = []
+    t = v = shift = 0
+    for byte in memoryview(data)[HEADER.size:]:
+        v |= (byte & 0x7f) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        t += v >> CODE_BITS
+        events.append((t, v & CODE_MASK))
+        v = shift = 0
+    return Replay(idx, maze_pack.DIFFICULTY_NAMES[diff_id], seed, cols, rows, version, events)
+
+def replay_level(replay, levels=None, huge_pack=None):
+    # the level the replay was recorded on, rebuilt from its parameters. A huge maze is read
+    # from huge_pack (a streamed maze_pack.LevelPack) when it is the one the replay was on.
+    if replay.generator_version != GENERATOR_VERSION:
+        raise ValueError(f"replay was recorded with generator version {replay.generator_version}, "
+                         f"this build has {GENERATOR_VERSION}")
+    if replay.idx == HUGE_LEVEL_IDX:
+        for key in huge_pack.keys() if huge_pack else ():
+            grid = huge_pack.grid(*key)
+            if huge_pack.seed(*key) == replay.seed and (grid.cols, grid.rows) == (replay.cols, replay.rows):
+                return MazeLevel.huge(replay.difficulty, replay.seed, grid, metrics=huge_pack.metrics(*key))
+        return MazeLevel.huge(replay.difficulty, replay.seed, huge_grid(replay.seed, replay.cols, replay.rows))
+    if replay.seed != level_seed(replay.idx):
+        raise ValueError(f"replay seed {replay.seed} does not match level {replay.idx + 1}")
+    if levels is None:
+        return MazeLevel(replay.idx, replay.difficulty).prepare()
+    return levels.get(replay.idx, replay.difficulty)
+
+# ---------- Headless replay ----------
+def run_replay(replay, level=None, levels=None):
+    # fast-forward on a fake clock, in the order run() sees them: input, then the timer check.
+    # Returns the GameCore in its final state.
+    now = [0]
+    if levels is None:
+        levels = LevelProvider(replay.difficulty)
+    core = GameCore(levels, replay.difficulty, clock=lambda: now[0])
+    core.load_level(replay.idx, level or replay_level(replay, levels))
+    move, update = core.move, core.update
+    for t, code in replay.events:
+        now[0] = t
+        if code < INPUT_HINT:
+            move(code)
+        elif code == INPUT_HINT:
+            core.use_hint()
+        elif code == INPUT_PAUSE:
+            core.pause()
+        elif code == INPUT_RESUME:
+            core.resume()
+        update()
+    return core
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify recorded Maze Runner replays headlessly")
+    parser.add_argument('paths', nargs='+', metavar='REPLAY')
+    parser.add_argument('--huge-pack', metavar='PATH',
+                        help="streamed maze (maze_game.py --stream-maze) that huge-mode replays were played on")
+    args = parser.parse_args(argv)
+    huge_pack = maze_pack.LevelPack(args.huge_pack) if args.huge_pack else None
+    levels = {}
+    for path in args.paths:
+        replay = read_replay(path)
+        provider = levels.get(replay.difficulty)
+        if provider is None:
+            provider = levels[replay.difficulty] = LevelProvider(replay.difficulty, pack=maze_pack.open_pack())
+        level = replay_level(replay, provider, huge_pack)
+        t = time.perf_counter()
+        core = run_replay(replay, level, provider)
+        dt = time.perf_counter() - t
+        game_s = replay.duration_ms() / 1000
+        speed = f"{game_s / dt:,.0f}x" if dt > 0 else "-"
+        print(f"{path}: {core.state} at {game_s:.1f}s, {len(replay.events)} inputs, "
+              f"{level.hint_used} hints, replayed in {dt * 1e3:.2f} ms ({speed})")
+    for provider in levels.values():
+        provider.close()
+    if huge_pack:
+        huge_pack.close()
+
+if __name__ == '__main__':
+    main()
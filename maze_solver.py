@@ -0,0 +1,345 @@
+import heapq
+from array import array
+from collections import namedtuple
+from concurrent.futures import CancelledError
+
+try:
+    import numpy as np
+except ImportError:  # batched queries fall back to plain Python
+    np = None
+
+from maze_grid import OPEN_DIRS
+
+# ---------- Distance field (BFS from a fixed target) ----------
+class DistanceField:
+    __slots__ = ('cols', 'target', 'dist', 'parent')
+
+    def __init__(self, grid, target):
+        cols = grid.cols
+        n = cols * grid.rows
+        cells = grid.cells
+        dist = array('i', [-1]) * n
+        parent = array('i', [-1]) * n  # next cell index towards target, -1 at target/unreachable
+        step = (-cols, 1, cols, -1)
+        t = target[0]*cols + target[1]
+        dist[t] = 0
+        # preallocated FIFO: no per-cell int objects kept alive on huge grids
+        queue = array('i', [0]) * n
+        queue[0] = t
+        head, tail = 0, 1
+        while head < tail:
+            i = queue[head]
+            head += 1
+            nd = dist[i] + 1
+            for d in OPEN_DIRS[cells[i]]:
+                j = i + step[d]
+                if dist[j] < 0:
+                    dist[j] = nd
+                    parent[j] = i
+                    queue[tail] = j
+                    tail += 1
+        self.cols = cols
+        self.target = tuple(target)
+        self.dist = dist
+        self.parent = parent
+
+    def distance(self, pos):
+        # -1 when pos cannot reach the target
+        return self.dist[pos[0]*self.cols + pos[1]]
+
+    def next_cell(self, pos):
+        j = self.parent[pos[0]*self.cols + pos[1]]
+        return None if j < 0 else divmod(j, self.cols)
+
+    def path_from(self, pos):
+        # shortest path pos -> target, both ends included; O(path length)
+        cols = self.cols
+        parent = self.parent
+        i = pos[0]*cols + pos[1]
+        if self.dist[i] < 0:
+            return None
+        path = [divmod(i, cols)]
+        while parent[i] >= 0:
+            i = parent[i]
+            path.append(divmod(i, cols))
+        return path
+
+# ---------- Tree field (perfect mazes, one byte per cell) ----------
+# first open side >= s of wall mask m at [m*5 + s], 4 if none
+_NEXT_OPEN = bytes(next((d for d in OPEN_DIRS[m] if d >= s), 4) for m in range(16) for s in range(5))
+_AT_TARGET = 254
+_UNSEEN = 255
+
+class TreeField:
+    # DistanceField for a perfect maze in one byte per cell (the side its next step towards
+    # target leaves by) instead of twelve, for grids too big to BFS with whole-maze arrays.
+    # Distances are walked rather than stored; a query one step from the last is O(1).
+    __slots__ = ('cols', 'target', 'up', 'step', '_last')
+
+    def __init__(self, cols, target, up):
+        self.cols = cols
+        self.target = tuple(target)
+        self.up = up
+        self.step = (-cols, 1, cols, -1)
+        self._last = (target[0]*cols + target[1], 0)
+
+    @classmethod
+    def build(cls, grid, target, cancel=None):
+        # None unless the grid is a spanning tree. Depth-first with no stack: up[] leads back
+        # out of a finished branch. cancel (a threading.Event) is polled as the walk goes.
+        cols = grid.cols
+        n = cols * grid.rows
+        cells = grid.cells
+        nxt = _NEXT_OPEN
+        step = (-cols, 1, cols, -1)
+        up = bytearray([_UNSEEN]) * n
+        t = target[0]*cols + target[1]
+        up[t] = _AT_TARGET
+        i, d, left = t, 0, n - 1
+        while True:
+            m = cells[i] * 5
+            k = nxt[m + d]
+            if k == up[i]:
+                k = nxt[m + k + 1]
+            if k < 4:
+                i += step[k]
+                if up[i] != _UNSEEN:
+                    return None  # reached twice: a loop
+                up[i] = k ^ 2  # back the way we came (OPPOSITE)
+                d = 0
+                left -= 1
+                if cancel is not None and not left & 0xFFFF and cancel.is_set():
+                    raise CancelledError
+            elif i == t:
+                break
+            else:
+                # branch done: up to the parent, on with its next side
+                k = up[i]
+                i += step[k]
+                d = (k ^ 2) + 1
+        return cls(cols, target, up) if left == 0 else None
+
+    def distance(self, pos):
+        up, step = self.up, self.step
+        i = pos[0]*self.cols + pos[1]
+        last, dist = self._last
+        if i == last:
+            return dist
+        k = up[i]
+        if k < 4 and i + step[k] == last:
+            dist += 1
+        elif up[last] < 4 and last + step[up[last]] == i:
+            dist -= 1
+        else:
+            dist = 0
+            j = i
+            while up[j] < 4:
+                j += step[up[j]]
+                dist += 1
+        self._last = (i, dist)
+        return dist
+
+    def next_cell(self, pos):
+        i = pos[0]*self.cols + pos[1]
+        k = self.up[i]
+        return None if k > 3 else divmod(i + self.step[k], self.cols)
+
+    def path_from(self, pos):
+        # pos -> target, both ends included; O(path length)
+        cols, up, step = self.cols, self.up, self.step
+        i = pos[0]*cols + pos[1]
+        path = [divmod(i, cols)]
+        while up[i] < 4:
+            i += step[up[i]]
+            path.append(divmod(i, cols))
+        return path
+
+# ---------- Tree index (perfect mazes: LCA by binary lifting) ----------
+class TreeIndex:
+    __slots__ = ('cols', 'depth', 'up', '_np')
+
+    def __init__(self, cols, depth, parent):
+        self.cols = cols
+        self.depth = depth
+        # up[k][i] = 2**k-th ancestor of cell i; the root is its own parent
+        up = [parent]
+        for _ in range(1, max(1, max(depth).bit_length())):
+            prev = up[-1]
+            up.append(array('i', map(prev.__getitem__, prev)))
+        self.up = up
+        self._np = None
+
+    @classmethod
+    def build(cls, grid, root=(0,0)):
+        # None unless the grid is a spanning tree: every cell reachable, no loops
+        cols = grid.cols
+        n = cols * grid.rows
+        cells = grid.cells
+        if sum(len(OPEN_DIRS[m]) for m in cells) != 2*(n-1):
+            return None
+        depth = array('i', [-1]) * n
+        parent = array('i', [0]) * n
+        step = (-cols, 1, cols, -1)
+        r = root[0]*cols + root[1]
+        depth[r] = 0
+        parent[r] = r
+        queue = array('i', [0]) * n
+        queue[0] = r
+        head, tail = 0, 1
+        while head < tail:
+            i = queue[head]
+            head += 1
+            nd = depth[i] + 1
+            for d in OPEN_DIRS[cells[i]]:
+                j = i + step[d]
+                if depth[j] < 0:
+                    depth[j] = nd
+                    parent[j] = i
+                    queue[tail] = j
+                    tail += 1
+        if tail != n:
+            return None
+        return cls(cols, depth, parent)
+
+    def _lca(self, a, b):
+        depth = self.depth
+        up = self.up
+        if depth[a] < depth[b]:
+            a, b = b, a
+        diff = depth[a] - depth[b]
+        k = 0
+        while diff:
+            if diff & 1:
+                a = up[k][a]
+            diff >>= 1
+            k += 1
+        if a == b:
+            return a
+        for k in range(len(up)-1, -1, -1):
+            ua = up[k]
+            if ua[a] != ua[b]:
+                a = ua[a]
+                b = ua[b]
+        return up[0][a]
+
+    def lca(self, a, b):
+        cols = self.cols
+        return divmod(self._lca(a[0]*cols + a[1], b[0]*cols + b[1]), cols)
+
+    def distance(self, a, b):
+        # O(log n)
+        cols = self.cols
+        i = a[0]*cols + a[1]
+        j = b[0]*cols + b[1]
+        depth = self.depth
+        return depth[i] + depth[j] - 2*depth[self._lca(i, j)]
+
+    def path(self, a, b):
+        # a -> b, both ends included; O(path length) after the LCA lookup
+        cols = self.cols
+        parent = self.up[0]
+        i = a[0]*cols + a[1]
+        j = b[0]*cols + b[1]
+        top = self._lca(i, j)
+        head = []
+        while i != top:
+            head.append(divmod(i, cols))
+            i = parent[i]
+        tail = []
+        while j != top:
+            tail.append(divmod(j, cols))
+            j = parent[j]
+        head.append(divmod(top, cols))
+        tail.reverse()
+        return head + tail
+
+    def distances(self, pairs):
+        # batched distance() for a sequence of (a, b) cell pairs
+        if np is None:
+            return [self.distance(a, b) for a, b in pairs]
+        if self._np is None:
+            self._np = (np.frombuffer(self.depth, dtype=np.int32),
+                        [np.frombuffer(u, dtype=np.int32) for u in self.up])
+        depth, up = self._np
+        q = np.asarray(pairs, dtype=np.int64).reshape(-1, 4)
+        a = q[:, 0]*self.cols + q[:, 1]
+        b = q[:, 2]*self.cols + q[:, 3]
+        da = depth[a]
+        db = depth[b]
+        swap = da < db
+        a, b = np.where(swap, b, a), np.where(swap, a, b)
+        diff = np.abs(da - db)
+        for k, uk in enumerate(up):
+            a = np.where((diff >> k) & 1, uk[a], a)
+        for uk in reversed(up):
+            ua = uk[a]
+            ub = uk[b]
+            m = ua != ub
+            a = np.where(m, ua, a)
+            b = np.where(m, ub, b)
+        top = np.where(a == b, a, up[0][a])
+        return (da + db - 2*depth[top]).tolist()
+
+    def paths(self, pairs):
+        return [self.path(a, b) for a, b in pairs]
+
+# ---------- Level metrics ----------
+# open sides of every wall mask
+DEGREE = tuple(len(dirs) for dirs in OPEN_DIRS)
+
+# path_length: shortest start->goal steps (-1 unreachable); dead_ends: cells with one
+# open side; junctions: three or more; mean_corridor: edges per corridor, a corridor
+# being a run of two-sided cells between dead ends/junctions
+LevelMetrics = namedtuple('LevelMetrics', 'path_length dead_ends junctions mean_corridor')
+
+METRICS_CHUNK = 1 << 20  # wall bytes counted per slice: a pack-mapped grid is never copied whole
+
+def level_metrics(grid, start=(0,0), goal=None, field=None):
+    # one BFS towards goal (or reuse field, a DistanceField/TreeField for it) plus a histogram
+    # of the wall bytes; corridor counts follow from the degrees, no second traversal
+    if goal is None:
+        goal = (grid.rows-1, grid.cols-1)
+    if field is None:
+        field = DistanceField(grid, goal)
+    cells = grid.cells
+    by_degree = [0] * 5
+    for lo in range(0, len(cells), METRICS_CHUNK):
+        data = bytes(cells[lo:lo + METRICS_CHUNK])
+        for mask in range(16):
+            by_degree[DEGREE[mask]] += data.count(mask)
+    edges = sum(d * k for d, k in enumerate(by_degree)) // 2
+    ends = sum(d * k for d, k in enumerate(by_degree) if d != 2)  # each corridor has two
+    corridors = max(1, ends // 2)
+    return LevelMetrics(field.distance(start), by_degree[1], by_degree[3] + by_degree[4], edges / corridors)
+
+# ---------- A* pathfinder (general fallback, works with loops) ----------
+def a_star(start, goal, walls, cols, rows):
+    # walls is a MazeGrid; outer walls are always set, so open sides stay in bounds
+    neighbors = walls.neighbors
+    sx, sy = start
+    gx, gy = goal
+    open_set = []
+    heapq.heappush(open_set, (0, sx, sy))
+    came_from = {}
+    gscore = { (sx,sy): 0 }
+    def h(a,b):
+        return abs(a[0]-b[0]) + abs(a[1]-b[1])
+    while open_set:
+        _, r, c = heapq.heappop(open_set)
+        if (r,c) == (gx,gy):
+            path=[]
+            cur=(r,c)
+            while cur in came_from:
+                path.append(cur)
+                cur = came_from[cur]
+            path.append((sx,sy))
+            path.reverse()
+            return path
+        for nr,nc in neighbors(r,c):
+            tentative = gscore[(r,c)] + 1
+            if (nr,nc) not in gscore or tentative < gscore[(nr,nc)]:
+                gscore[(nr,nc)] = tentative
+                priority = tentative + h((nr,nc),(gx,gy))
+                heapq.heappush(open_set, (priority, nr, nc))
+                came_from[(nr,nc)] = (r,c)
+    return None
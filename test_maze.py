@@ -0,0 +1,166 @@
+import random
+
+import pytest
+
+from maze_core import GameCore, LevelProvider, MazeLevel
+from maze_grid import DIR_OF_DELTA
+from maze_replay import HEADER, REPLAY_FORMAT, REPLAY_MAGIC, InputRecorder, read_replay, run_replay
+
+# game rules only: nothing here needs pygame or a level pack on disk
+
+class FakeClock:
+    def __init__(self):
+        self.ms = 0
+    def __call__(self):
+        return self.ms
+
+def solution(level, start=None):
+    # maze_grid directions along the shortest path to the goal
+    path = level.goal_field.path_from(start or level.start)
+    return [DIR_OF_DELTA[(b[0] - a[0], b[1] - a[1])] for a, b in zip(path, path[1:])]
+
+@pytest.fixture
+def levels():
+    provider = LevelProvider('Normal')
+    yield provider
+    provider.close()
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def core(levels, clock):
+    core = GameCore(levels, 'Normal', clock=clock)
+    core.load_level(0)
+    return core
+
+# ---------- GameCore ----------
+def test_walls_block_moves(core):
+    # (0, 0): the outer walls are above and to the left
+    assert not core.move(0)
+    assert not core.move(3)
+    assert core.pos == (0, 0)
+    lvl = core.level
+    open_dirs = [d for d in range(4) if not lvl.walls.cells[0] >> d & 1]
+    assert open_dirs and core.move(open_dirs[0])
+    assert core.pos != (0, 0)
+
+def test_solution_completes_level(core, clock):
+    for d in solution(core.level):
+        clock.ms += 100
+        assert core.move(d)
+    assert core.pos == core.level.goal
+    assert core.state == 'level_complete'
+    assert not core.move(0) and not core.move(2)  # no moving once it is over
+
+def test_time_runs_out(core, clock):
+    clock.ms = core.time_left * 1000
+    assert not core.update()  # the last whole second is still playable
+    clock.ms += 1000
+    assert core.update()
+    assert core.state == 'timeup'
+    assert core.time_remaining() == 0
+    assert not core.move(solution(core.level)[0])
+
+def test_pause_stops_the_clock(core, clock):
+    clock.ms = 5000
+    core.pause()
+    assert core.state == 'pause'
+    clock.ms += core.time_left * 1000 * 10
+    assert core.elapsed() == 5
+    assert not core.update()
+    core.resume()
+    assert core.elapsed() == 5
+    clock.ms += 2000
+    assert core.elapsed() == 7
+
+def test_hints_run_out(core):
+    lvl = core.level
+    for left in range(core.hints_left - 1, -1, -1):
+        path = core.use_hint()
+        assert path[0] == core.pos and path[-1] == lvl.goal
+        assert core.hints_left == left
+    assert core.use_hint() is None
+
+def test_hint_follows_the_player(core):
+    lvl = core.level
+    core.use_hint()
+    core.move(solution(lvl)[0])
+    assert lvl.hint_path[0] == core.pos and lvl.hint_path[-1] == lvl.goal
+
+# ---------- Replays ----------
+def test_replay_round_trip(tmp_path, levels, clock):
+    recorder = InputRecorder(str(tmp_path))
+    core = GameCore(levels, 'Normal', clock=clock)
+    core.recorder = recorder
+    core.load_level(1)
+    rng = random.Random(3)
+    for _ in range(40):
+        clock.ms += rng.randrange(50, 400)
+        core.move(rng.randrange(4))
+    clock.ms += 250
+    core.use_hint()
+    core.pause()
+    clock.ms += 30_000
+    core.resume()
+    for d in solution(core.level, core.pos):
+        clock.ms += 120
+        core.move(d)
+    assert core.state == 'level_complete'
+    recorder.close()
+
+    [path] = tmp_path.glob('*.mzrp')
+    replay = read_replay(str(path))
+    assert (replay.idx, replay.difficulty, replay.seed) == (1, 'Normal', core.level.seed)
+    replayed = run_replay(replay, levels=levels)
+    assert (replayed.state, replayed.pos, replayed.hints_left) == (core.state, core.pos, core.hints_left)
+    assert replayed.play_ms() == core.play_ms()
+
+def test_replay_rejects_old_format(tmp_path):
+    path = tmp_path / 'old.mzrp'
+    path.write_bytes(HEADER.pack(REPLAY_MAGIC, REPLAY_FORMAT - 1, 1, 0, 0, 0, 10, 10))
+    with pytest.raises(ValueError, match='format'):
+        read_replay(str(path))
+
+# ---------- Batched environment ----------
+def test_batch_env_matches_core(levels, clock):
+    np = pytest.importorskip('numpy')
+    from maze_batch import BatchEnv
+    mazes = [MazeLevel(i, 'Normal') for i in (0, 7, 14)]
+    env = BatchEnv(mazes, 6, 'Normal', auto_reset=False)
+    cores = []
+    for i in env.level_of:
+        core = GameCore(levels, 'Normal', clock=clock)
+        core.load_level(mazes[i].idx, mazes[i])
+        cores.append(core)
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        actions = rng.integers(0, 4, env.n)
+        moved, _, _ = env.step(actions)
+        assert moved.tolist() == [core.move(int(a)) for core, a in zip(cores, actions)]
+        assert [tuple(p) for p in env.positions().tolist()] == [core.pos for core in cores]
+
+def test_batch_env_counts_goals():
+    pytest.importorskip('numpy')
+    from maze_batch import BatchEnv
+    levels = [MazeLevel(i, 'Normal') for i in (0, 3)]
+    env = BatchEnv(levels, 2, 'Normal', auto_reset=False)
+    routes = [solution(lvl) for lvl in levels]
+    steps = max(map(len, routes))
+    for t in range(steps):
+        env.step([route[t] if t < len(route) else 0 for route in routes])
+    assert env.reached == 2 and env.timeouts == 0
+    assert env.done.all()
+    assert [tuple(p) for p in env.positions().tolist()] == [lvl.goal for lvl in levels]
+
+# ---------- Invariant harness ----------
+def test_maze_check_smoke():
+    pytest.importorskip('numpy')
+    import maze_check
+    for name in sorted(maze_check.GENERATORS):
+        for seed in range(2):
+            bad, queries = maze_check.check_maze(name, 12, 9, seed)
+            assert bad == [], (name, seed)
+            assert queries > 0
+    assert maze_check.main(['--seeds', '1', '--size', '8', '6', '--workers', '1']) == 0